@@ -0,0 +1,105 @@
+"""Compare the per-product and set based ways of adding products to a subscription plan.
+
+    python scripts/plan_products_benchmark.py --products 1000 --variants 5 --runs 3
+
+Each run adds the same generated catalog twice to a scratch plan (a fresh insert,
+then a repeat where everything already exists) with the previous per-product
+loop and with add_products_and_variants_to_plan, counting statements sent to
+the database. Everything runs in transactions that are rolled back, nothing is
+left in DATABASE_URL.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from sqlalchemy import event, select  # noqa: E402
+
+from backend.config.db import AsyncSessionLocal, async_engine  # noqa: E402
+# Every model module must be imported for the mappers to configure
+from backend.accounts import models as accounts_models  # noqa: E402,F401
+from backend.resume import models as resume_models  # noqa: E402,F401
+from backend.subscription.constants import MONTHLY  # noqa: E402
+from backend.subscription.models import SubscriptionPlan, SubscriptionPlanProduct, SubscriptionPlanProductVariant  # noqa: E402
+from backend.subscription.services import add_products_and_variants_to_plan  # noqa: E402
+
+
+async def add_products_per_product(plan_id, products_dict, db):
+    """The previous implementation: a lookup, insert and flush per product and per variant list."""
+    for product in products_dict:
+        db_product = await db.scalar(select(SubscriptionPlanProduct).where(
+            SubscriptionPlanProduct.subscription_plan_id == plan_id,
+            SubscriptionPlanProduct.product_id == product.product_id,
+        ))
+        if not db_product:
+            db_product = SubscriptionPlanProduct(subscription_plan_id=plan_id, product_id=product.product_id)
+            db.add(db_product)
+            await db.flush()
+        if product.variants:
+            existing_variant_ids = set((await db.scalars(select(SubscriptionPlanProductVariant.variant_id).where(
+                SubscriptionPlanProductVariant.subscription_plan_product_id == db_product.id,
+                SubscriptionPlanProductVariant.variant_id.in_(product.variants),
+            ))).all())
+            db.add_all([
+                SubscriptionPlanProductVariant(subscription_plan_product_id=db_product.id, variant_id=variant)
+                for variant in product.variants if variant not in existing_variant_ids
+            ])
+            await db.flush()
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+async def measure(implementation, products: list, counter: StatementCounter) -> list[tuple[float, int]]:
+    """(seconds, statements) for a fresh add and for a repeated add of `products`."""
+    async with AsyncSessionLocal() as db:
+        plan = SubscriptionPlan(name="benchmark", price=0, interval=MONTHLY)
+        db.add(plan)
+        await db.flush()
+        results = []
+        for _ in range(2):
+            counter.count = 0
+            started = time.perf_counter()
+            await implementation(plan.id, products, db)
+            await db.flush()
+            results.append((time.perf_counter() - started, counter.count))
+        await db.rollback()
+    return results
+
+
+async def main(product_count: int, variant_count: int, runs: int):
+    products = [
+        SimpleNamespace(product_id=9_000_000_000 + index,
+                        variants=[9_100_000_000 + index * variant_count + variant for variant in range(variant_count)])
+        for index in range(product_count)
+    ]
+    counter = StatementCounter()
+    implementations = [("per product", add_products_per_product), ("set based", add_products_and_variants_to_plan)]
+    print(f"{product_count} products x {variant_count} variants, median of {runs} runs")
+    for name, implementation in implementations:
+        samples = [await measure(implementation, products, counter) for _ in range(runs)]
+        for phase, label in enumerate(("insert", "repeat")):
+            seconds = statistics.median(sample[phase][0] for sample in samples)
+            statements = samples[-1][phase][1]
+            print(f"  {name:12} {label:7} {seconds * 1000:10.1f} ms  {statements:6} statements")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--variants", type=int, default=5, help="Variants per product")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.products, args.variants, args.runs))
@@ -0,0 +1,39 @@
+"""Send the subscription expiry reminder campaign, meant to run from cron.
+
+    python scripts/run_expiry_campaign.py --days 3
+
+Users are reminded once per subscription; running it again (or after a crash)
+only reaches subscriptions that were not claimed by an earlier run. Settings,
+including the SMTP pool and CAMPAIGN_RATE_PER_SECOND, come from the environment.
+"""
+import os
+import sys
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from backend.config.config import Config  # noqa: E402
+# Every model module must be imported for the mappers to configure
+from backend.accounts import models as accounts_models  # noqa: E402,F401
+from backend.resume import models as resume_models  # noqa: E402,F401
+from backend.base.email_templates import email_templates  # noqa: E402
+from backend.base.mailer import smtp_pool  # noqa: E402
+from backend.subscription.campaigns import run_expiry_reminder_campaign  # noqa: E402
+
+
+async def main(days_ahead: int):
+    email_templates.precompile()
+    try:
+        summary = await run_expiry_reminder_campaign(days_ahead)
+    finally:
+        await smtp_pool.close()
+    print(f"{summary['key']}: {summary['sent_count']} sent, {summary['failed_count']} failed "
+          f"({summary['started_at']:%Y-%m-%d %H:%M:%S} - {summary['finished_at']:%Y-%m-%d %H:%M:%S})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=Config.EXPIRY_REMINDER_DAYS, help="Remind subscriptions ending within this many days")
+    args = parser.parse_args()
+    asyncio.run(main(args.days))
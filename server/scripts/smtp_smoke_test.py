@@ -0,0 +1,159 @@
+"""Smoke test the outbound email path against a local aiosmtpd server.
+
+    pip install aiosmtpd
+    python scripts/smtp_smoke_test.py --emails 50 --recipients 50
+
+Starts aiosmtpd on a free local port and sends templated emails to it through
+an EmailQueue and through a CampaignRunner, each with its own
+SMTPConnectionPool. The server refuses the first delivery to one queued
+recipient with a transient 451, which must be retried, and always refuses one
+campaign recipient with a 550, which must be counted as failed. The campaign
+is run twice, the second run must send nothing. Exits non zero unless every
+email arrives exactly once. The campaign rows are deleted afterwards, the
+database is DATABASE_URL as usual.
+"""
+import os
+import sys
+import socket
+import asyncio
+import argparse
+from uuid import uuid4
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from sqlalchemy import Integer, String, select, delete, values, column  # noqa: E402
+
+from backend.config.db import AsyncSessionLocal, async_engine  # noqa: E402
+# Every model module must be imported for the mappers to configure
+from backend.accounts import models as accounts_models  # noqa: E402,F401
+from backend.resume import models as resume_models  # noqa: E402,F401
+from backend.subscription import models as subscription_models  # noqa: E402,F401
+from backend.base.email_templates import email_templates  # noqa: E402
+from backend.base.mailer import SMTPConnectionPool, EmailQueue  # noqa: E402
+from backend.base.models import EmailCampaign, EmailCampaignRecipient  # noqa: E402
+from backend.base.campaigns import CampaignRunner  # noqa: E402
+
+SENDER = "smoke@example.com"
+FLAKY_RECIPIENT = "flaky@example.com"
+REJECTED_RECIPIENT = "rejected@example.com"
+
+
+class RecordingHandler:
+    """aiosmtpd handler that records recipients, refuses the first message to FLAKY_RECIPIENT and all to REJECTED_RECIPIENT."""
+
+    def __init__(self):
+        self.received = Counter()
+        self.refused = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if REJECTED_RECIPIENT in envelope.rcpt_tos:
+            return "550 No such user"
+        if FLAKY_RECIPIENT in envelope.rcpt_tos and not self.refused:
+            self.refused += 1
+            return "451 Try again later"
+        self.received.update(envelope.rcpt_tos)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(handler):
+    from aiosmtpd.controller import Controller
+
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    return controller
+
+
+def build_pool(controller, size: int) -> SMTPConnectionPool:
+    return SMTPConnectionPool(size=size, hostname=controller.hostname, port=controller.port, username=SENDER,
+                              password="", start_tls=False, timeout=10, max_idle=60)
+
+
+async def check_mailer(controller, handler, email_count: int, pool_size: int) -> list[str]:
+    queue = EmailQueue(build_pool(controller, pool_size), queue_size=email_count + 1, batch_size=10,
+                       max_attempts=3, retry_base_seconds=0.1)
+    recipients = [f"user{index}@example.com" for index in range(email_count - 1)] + [FLAKY_RECIPIENT]
+    await queue.start()
+    for to_email in recipients:
+        queued = await queue.enqueue(to_email, "Smoke test", "email_verification.html",
+                                     {"name": "Smoke", "link": "http://localhost/verify"})
+        if not queued:
+            return [f"{to_email} was not queued"]
+    # Let the retry of the refused message go through before stop() drains the queue
+    await asyncio.sleep(0.5)
+    await queue.stop()
+
+    failures = [f"{to_email} received {handler.received[to_email]} times" for to_email in recipients
+                if handler.received[to_email] != 1]
+    if not handler.refused:
+        failures.append("the transient refusal was never exercised")
+    if await EmailQueue(build_pool(controller, 1), 1, 1, 1, 0).enqueue(SENDER, "x", "x", {}):
+        failures.append("a queue that was never started accepted an email")
+    return failures
+
+
+async def check_campaign(controller, handler, recipient_count: int, pool_size: int) -> list[str]:
+    recipients = [(index, f"member{index}@example.com", f"Member {index}") for index in range(1, recipient_count)]
+    recipients.append((recipient_count, REJECTED_RECIPIENT, "Rejected"))
+    rows = values(column("source_id", Integer), column("to_email", String), column("name", String),
+                  name="smoke_recipients").data(recipients)
+    key = f"smoke-{uuid4()}"
+    runner = CampaignRunner(key, "email_verification.html", "Smoke test campaign",
+                            select(rows.c.source_id, rows.c.to_email, rows.c.name), rows.c.source_id,
+                            shared_context={"link": "http://localhost/verify"}, batch_size=7, rate_per_second=0,
+                            pool=build_pool(controller, pool_size))
+    try:
+        first = await runner.run()
+        second = await runner.run()
+    finally:
+        await runner.pool.close()
+        async with AsyncSessionLocal() as db:
+            campaign_id = select(EmailCampaign.id).where(EmailCampaign.key == key).scalar_subquery()
+            await db.execute(delete(EmailCampaignRecipient).where(EmailCampaignRecipient.campaign_id == campaign_id))
+            await db.execute(delete(EmailCampaign).where(EmailCampaign.key == key))
+            await db.commit()
+    print(f"campaign: first run {first['sent_count']} sent, {first['failed_count']} failed; "
+          f"second run {second['sent_count'] - first['sent_count']} sent")
+
+    failures = [f"{to_email} received {handler.received[to_email]} times" for _, to_email, _ in recipients[:-1]
+                if handler.received[to_email] != 1]
+    if handler.received[REJECTED_RECIPIENT]:
+        failures.append(f"{REJECTED_RECIPIENT} was delivered although the server refused it")
+    if (first["sent_count"], first["failed_count"]) != (recipient_count - 1, 1):
+        failures.append(f"first run counted {first['sent_count']} sent and {first['failed_count']} failed")
+    if (second["sent_count"], second["failed_count"]) != (first["sent_count"], first["failed_count"]):
+        failures.append("the second run sent to recipients claimed by the first")
+    return failures
+
+
+async def main(email_count: int, recipient_count: int, pool_size: int) -> int:
+    email_templates.precompile()
+    handler = RecordingHandler()
+    controller = start_server(handler)
+    try:
+        failures = await check_mailer(controller, handler, email_count, pool_size)
+        print(f"mailer: {sum(handler.received.values())} delivered, {handler.refused} refused and retried")
+        failures += await check_campaign(controller, handler, recipient_count, pool_size)
+    finally:
+        controller.stop()
+        await async_engine.dispose()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=50, help="Emails sent through the queue")
+    parser.add_argument("--recipients", type=int, default=50, help="Campaign recipients, one of them is refused")
+    parser.add_argument("--pool-size", type=int, default=2, help="SMTP connections, also the number of sending workers")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.emails, args.recipients, args.pool_size)))
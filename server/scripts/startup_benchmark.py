@@ -0,0 +1,91 @@
+"""Measure how long importing the FastAPI app takes and fail when it exceeds a budget.
+
+Runs `python -X importtime -c "import main"` from server/src a few times in fresh
+interpreters, reports the median cumulative import time of `main` and the slowest
+modules, and exits non zero when the median is over budget or when a module that
+must stay off the startup path (openai, shopify...) gets imported.
+
+    python scripts/startup_benchmark.py --budget-ms 1500 --runs 5
+
+The app settings are read from the environment as usual (DATABASE_URL, SMTP_*...),
+no database connection is opened while importing.
+"""
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+# Heavy optional clients that are imported lazily, on first use
+DEFAULT_FORBIDDEN = ("openai", "shopify", "requests", "jinja2", "aiosmtplib", "jose", "redis")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def run_importtime(module: str) -> list[tuple[int, int, str]]:
+    """Return (self_us, cumulative_us, module) for every module imported by `import <module>`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append((int(match.group(1)), int(match.group(2)), match.group(4)))
+    return entries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure, the median is reported")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("STARTUP_BUDGET_MS", 1500)),
+                        help="Maximum median import time in milliseconds (env STARTUP_BUDGET_MS)")
+    parser.add_argument("--top", type=int, default=15, help="How many of the slowest modules to list")
+    parser.add_argument("--forbid", nargs="*", default=list(DEFAULT_FORBIDDEN),
+                        help="Top level packages that must not be imported at startup")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.runs):
+        entries = run_importtime(args.module)
+        total = next((cumulative for _, cumulative, name in entries if name == args.module), None)
+        if total is None:
+            raise SystemExit(f"no importtime entry for {args.module}")
+        runs.append((total, entries))
+
+    totals = [total for total, _ in runs]
+    median_ms = statistics.median(totals) / 1000
+    # Report the slowest modules of the run closest to the median
+    _, entries = min(runs, key=lambda run: abs(run[0] / 1000 - median_ms))
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.runs} runs "
+          f"(min {min(totals) / 1000:.1f} ms, max {max(totals) / 1000:.1f} ms), budget {args.budget_ms:.0f} ms")
+    print("\nslowest modules by self time:")
+    for self_us, cumulative_us, name in sorted(entries, reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self  {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+
+    failed = False
+    imported = {name.split(".")[0] for _, _, name in entries}
+    forbidden = sorted(imported.intersection(args.forbid))
+    if forbidden:
+        failed = True
+        print(f"\nFAIL: imported at startup but should be lazy: {', '.join(forbidden)}")
+    if median_ms > args.budget_ms:
+        failed = True
+        print(f"\nFAIL: median import time {median_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+    if not failed:
+        print("\nOK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
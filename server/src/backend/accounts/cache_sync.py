@@ -0,0 +1,61 @@
+import json
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..base.cache_sync import cache_listener
+from .services import user_cache, invalidate_user_cache
+
+# Postgres NOTIFY channel carrying JSON lists of emails whose cached principal is stale
+USER_CACHE_CHANNEL = "user_cache_invalidate"
+# Payload asking every worker to drop its whole user cache
+USER_CACHE_CLEAR_ALL = "*"
+# NOTIFY payloads are limited to 8000 bytes, emails are sent in chunks below that
+NOTIFY_PAYLOAD_MAX_BYTES = 7000
+
+
+async def publish_user_cache_invalidation(db: AsyncSession, emails: list[str] | None):
+    """Ask every worker to drop the cached principals of `emails`, or all of them for None.
+
+    The notifications are sent inside `db`'s transaction, so Postgres only
+    delivers them once it commits, after the rows they describe are visible.
+    """
+    if emails is None:
+        await db.execute(select(func.pg_notify(USER_CACHE_CHANNEL, USER_CACHE_CLEAR_ALL)))
+        return
+    chunk, size = [], 2
+    for email in emails:
+        if chunk and size + len(email) + 4 > NOTIFY_PAYLOAD_MAX_BYTES:
+            await db.execute(select(func.pg_notify(USER_CACHE_CHANNEL, json.dumps(chunk))))
+            chunk, size = [], 2
+        chunk.append(email)
+        size += len(email) + 4
+    if chunk:
+        await db.execute(select(func.pg_notify(USER_CACHE_CHANNEL, json.dumps(chunk))))
+
+
+async def commit_user_changes(db: AsyncSession, emails: list[str] | None):
+    """Commit `db` and drop the cached principals of `emails` (all for None) in every worker."""
+    await publish_user_cache_invalidation(db, emails)
+    await db.commit()
+    # The listener drops them as well, this covers a process running without it
+    if emails is None:
+        user_cache.clear()
+    for email in emails or []:
+        invalidate_user_cache(email)
+
+
+def on_user_cache_notification(payload: str | None):
+    """Drop the entries named by a USER_CACHE_CHANNEL payload, everything for None or USER_CACHE_CLEAR_ALL."""
+    try:
+        emails = json.loads(payload) if payload is not None else None
+    except ValueError:
+        # USER_CACHE_CLEAR_ALL, or anything unexpected
+        emails = None
+    if emails is None:
+        user_cache.clear()
+        return
+    for email in emails:
+        user_cache.delete(email)
+
+
+cache_listener.register(USER_CACHE_CHANNEL, on_user_cache_notification)
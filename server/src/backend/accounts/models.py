@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index
 from datetime import datetime, timedelta
 from sqlalchemy.orm import relationship
 from ..config.db import Base
@@ -14,8 +14,10 @@ class User(Base):
     password = Column(String, nullable=False)
     is_verified = Column(Boolean, default=False)
     is_google_user = Column(Boolean, default=False)
-    referral_code = Column(String, nullable=True)
+    referral_code = Column(String, nullable=True, index=True)
     current_plan_id = Column(Integer, ForeignKey("subscription_plans.id"), nullable=True)
+    # Latest subscription by start_date, maintained by refresh_current_subscription; use_alter breaks the users <-> subscriptions cycle
+    current_subscription_id = Column(Integer, ForeignKey("subscriptions.id", use_alter=True, name="fk_users_current_subscription_id"), nullable=True)
     is_superuser = Column(Boolean, default=False)
 
     resumes = relationship("Resume", back_populates="user")
@@ -23,7 +25,8 @@ class User(Base):
     referred_by = relationship("Referral", foreign_keys="[Referral.referred_id]", back_populates="referred")
     verification_codes = relationship("VerificationCode", back_populates="user")
     current_plan = relationship("SubscriptionPlan", back_populates="users")
-    subscriptions = relationship("Subscription", back_populates="user")
+    subscriptions = relationship("Subscription", foreign_keys="[Subscription.user_id]", back_populates="user")
+    current_subscription = relationship("Subscription", foreign_keys=[current_subscription_id], post_update=True)
 
 
 
@@ -51,4 +54,9 @@ class VerificationCode(Base):
 
     user = relationship("User", back_populates="verification_codes")
 
+    __table_args__ = (
+        # Codes are looked up by user and purpose, the code itself already has a unique index
+        Index("ix_verification_codes_user_id_used_for", "user_id", "used_for"),
+    )
+
 
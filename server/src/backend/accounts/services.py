@@ -1,49 +1,101 @@
 import json
 import random
-import shopify
-import requests
-from passlib.context import CryptContext
 from fastapi.security import APIKeyHeader
 from fastapi import HTTPException, Request, Security, status, Depends
 
 from .constants import API_VERSION
-from ..base.auth import verify_token
+from ..base.auth import AuthenticatedUser, decode_token, verify_token
+from ..base.cache import TTLCache
 from ..config.config import Config
+from ..config.metrics import track_outbound
 from ..base import response
-from ..config.db import get_db
-from sqlalchemy.orm import Session
+from ..base import hashing
+from ..config.db import get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from ..accounts.models import User
+from ..subscription.models import Subscription
 
 api_key_header = APIKeyHeader(name="Authorization", auto_error=False)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
     
-def get_current_user(request: Request, api_key: str = Security(api_key_header), db: Session = Depends(get_db)):
+# Authenticated principals keyed by token subject (email). Entries are dropped in every
+# worker through cache_sync.commit_user_changes() when the user changes.
+user_cache = TTLCache(maxsize=Config.AUTH_CACHE_MAX_SIZE, ttl=Config.AUTH_CACHE_TTL_SECONDS)
+
+
+def invalidate_user_cache(email: str):
+    """Drop the cached principal of a user whose row was modified."""
+    user_cache.delete(email)
+
+
+def get_bearer_token(request: Request) -> str:
     token = request.headers.get("Authorization")
     if not token:
         raise response.BadRequest("Token not found")
     parts = token.split(" ")
     if len(parts) != 2 or parts[0].lower() != "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authorization header format")
-    token = parts[1]
-    try:
-        email = verify_token(token, response.BadRequest("Invalid token"))
-        user = db.query(User).filter(User.email == email).first()
+    return parts[1]
+
+
+async def load_authenticated_user(email: str, db: AsyncSession) -> AuthenticatedUser:
+    """Return the principal for `email`, hitting the users table only on a cache miss.
+
+    The current subscription and its plan are joined in the same query so the
+    cached principal is enough to bootstrap a session.
+    """
+    principal = user_cache.get(email)
+    if principal is None:
+        user = await db.scalar(
+            select(User).where(User.email == email)
+            .options(joinedload(User.current_subscription).joinedload(Subscription.plan))
+        )
         if not user:
             raise response.BadRequest("User not found")
+        principal = AuthenticatedUser.model_validate(user)
+        user_cache.set(email, principal)
+    return principal
+
+
+async def get_current_user(request: Request, api_key: str = Security(api_key_header), db: AsyncSession = Depends(get_async_db)) -> AuthenticatedUser:
+    token = get_bearer_token(request)
+    try:
+        email = verify_token(token, response.BadRequest("Invalid token"))
+        user = await load_authenticated_user(email, db)
+        request.state.user_id = user.id
         return user
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_token_user(request: Request, api_key: str = Security(api_key_header), db: AsyncSession = Depends(get_async_db)) -> AuthenticatedUser:
+    """Stateless variant of get_current_user for routes that only need the user id.
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+    The principal is built from the token claims; tokens issued before the
+    `user_id` claim existed fall back to the cached lookup. It never carries
+    privileges (is_superuser is always False): a token outlives changes to the
+    user row, so admin checks go through get_current_user.
+    """
+    token = get_bearer_token(request)
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        claims = decode_token(token, response.BadRequest("Invalid token"))
+        if claims.get("user_id") is None:
+            user = await load_authenticated_user(claims["email"], db)
+        else:
+            user = AuthenticatedUser(id=claims["user_id"], email=claims["email"])
+        request.state.user_id = user.id
+        return user
     except Exception as e:
-        return False
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+
+
+async def hash_password(password: str) -> str:
+    return await hashing.hash_password(password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await hashing.verify_password(plain_password, hashed_password)
 
 
 def referral_code_generator(name:str):
@@ -62,6 +114,8 @@ def generate_forgot_password_link(email: str, code: str) -> str:
 
 
 
+# The Shopify helpers below import `shopify` and `requests` when called: they are slow
+# to import and no route on the request path uses them.
 
 async def get_shopify_session(request: Request, api_key: str = Security(api_key_header)):
     token = request.headers.get("Authorization")
@@ -81,6 +135,7 @@ async def get_shopify_session(request: Request, api_key: str = Security(api_key_
         if not token_data:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
         
+        import shopify
         shopify.Session.setup(api_key=api_key, secret=token_data.shopifyToken)
         session = shopify.Session(token_data.shop_url, API_VERSION, token_data.shopifyToken)
 
@@ -99,6 +154,7 @@ async def get_shopify_session(request: Request, api_key: str = Security(api_key_
    
 
 async def get_current_shop_url(session: dict = Depends(get_shopify_session)):
+    import shopify
     try:
         shopify.ShopifyResource.activate_session(session)
         store = shopify.Shop.current()
@@ -116,6 +172,7 @@ async def get_current_shop_url(session: dict = Depends(get_shopify_session)):
 
 def get_product_collections():
     """Fetch all product-collection mappings efficiently."""
+    import shopify
     collects = shopify.Collect.find()
     product_collections = {}
 
@@ -131,6 +188,7 @@ def get_product_collections():
 def get_shopify_shop_products(session):
     """Fetch all products from Shopify."""
     """ Asuming session is already activated """
+    import shopify
     products = shopify.Product.find()
     products_map = {p.id: p.to_dict() for p in products}
     return products_map
@@ -138,49 +196,96 @@ def get_shopify_shop_products(session):
 def get_shopify_shop_products_with_collections(session):
     """Fetch all products from Shopify."""
     """ Asuming session is already activated """
+    import shopify
     products = shopify.Product.find()
     product_collections = get_product_collections()
     products_map = {p.id: {**p.to_dict(), "collections": product_collections.get(p.id, [])} for p in products}
-    print(products_map)
     return products_map
 
+class ShopifyCatalogIndex:
+    """Hash indexes over a products map from get_shopify_shop_products, built once.
+
+    Lookups by product, variant or collection are O(1), so validating n ids is
+    O(n) instead of scanning every variant of every product for each id.
+    Collections are indexed when the map comes from
+    get_shopify_shop_products_with_collections.
+    """
+
+    def __init__(self, products_map: dict):
+        self.products = products_map
+        self.variant_products = {}
+        self.collection_products = {}
+        for product_id, product in products_map.items():
+            for variant in product.get("variants") or []:
+                self.variant_products[variant.get("id")] = product_id
+            for collection in product.get("collections") or []:
+                self.collection_products.setdefault(collection.get("id"), set()).add(product_id)
+        self.variant_ids = set(self.variant_products)
+
+    def has_product(self, product_id) -> bool:
+        return product_id in self.products
+
+    def has_variant(self, variant_id) -> bool:
+        return variant_id in self.variant_ids
+
+    def product_of_variant(self, variant_id):
+        return self.variant_products.get(variant_id)
+
+    def products_in_collection(self, collection_id) -> set:
+        return self.collection_products.get(collection_id, set())
+
+
+def get_shopify_catalog_index(session, with_collections: bool = False) -> ShopifyCatalogIndex:
+    """Fetch the shop's products once and index them for validation."""
+    if with_collections:
+        return ShopifyCatalogIndex(get_shopify_shop_products_with_collections(session))
+    return ShopifyCatalogIndex(get_shopify_shop_products(session))
+
+
+def _catalog_index(catalog) -> ShopifyCatalogIndex:
+    # The validators accept a prebuilt index or, as before, a raw products map
+    return catalog if isinstance(catalog, ShopifyCatalogIndex) else ShopifyCatalogIndex(catalog)
+
+
 def validate_product(product_id, products_map):
     """Validate if a product exists in Shopify Store."""
-    if product_id not in products_map:
+    products = products_map.products if isinstance(products_map, ShopifyCatalogIndex) else products_map
+    if product_id not in products:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product with id {} not found".format(product_id))
     return True
     
 def validate_bulk_products(product_ids, products_map):
     """Validate if multiple products exist in Shopify Store."""
+    catalog = _catalog_index(products_map)
     for product_id in product_ids:
-        validate_product(product_id, products_map) if product_id else None
+        if product_id and not catalog.has_product(product_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product with id {} not found".format(product_id))
     return True
 
 def validate_variant(variant_id, products_map):
     """Validate if a variant exists in Shopify Store."""
-    all_variants = [v for p in products_map.values() for v in p.get("variants", [])]
-    varients_list = [v.get("id") for v in all_variants]
-    if variant_id not in varients_list:
+    if not _catalog_index(products_map).has_variant(variant_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Variant with id {} not found".format(variant_id))
     return True
     
 def validate_bulk_variants(variant_ids, products_map):
     """Validate if multiple variants exist in Shopify Store."""
-    all_variants = [v for p in products_map.values() for v in p.get("variants", [])]
-    varients_list = [v.get("id") for v in all_variants]
+    catalog = _catalog_index(products_map)
     for variant_id in variant_ids:
-        if variant_id not in varients_list:
+        if not catalog.has_variant(variant_id):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Variant with id {} not found".format(variant_id))
     return True
 
 def validate_product_and_variants(product_ids, variants_ids, products_map):
     """Validate if a product and its variants exist in Shopify Store."""
-    validate_bulk_products(product_ids, products_map) if product_ids else None
-    validate_bulk_variants(variants_ids, products_map) if variants_ids else None
+    catalog = _catalog_index(products_map)
+    validate_bulk_products(product_ids, catalog) if product_ids else None
+    validate_bulk_variants(variants_ids, catalog) if variants_ids else None
     return True
 
 def execute_shopify_graphql_query(shop_url, shopify_token, query, variables=None):  
   """Executes a Shopify GraphQL query."""
+  import requests
   url = f"https://{shop_url}/admin/api/{API_VERSION}/graphql.json"
   headers = {
     'Content-Type': 'application/json',
@@ -190,11 +295,13 @@ def execute_shopify_graphql_query(shop_url, shopify_token, query, variables=None
     'query': query,
     'variables': variables
   }
-  response = requests.post(url, headers=headers, json=payload)
+  with track_outbound("shopify"):
+    response = requests.post(url, headers=headers, json=payload)
   return response.json()
 
   
 def register_webhook(shop_domain: str, shopify_token: str):
+    import requests
     webhook_payload = {
         "webhook": {
             "topic": "subscription_contracts/create",  
@@ -203,14 +310,15 @@ def register_webhook(shop_domain: str, shopify_token: str):
         }
     }
 
-    response = requests.post(
-        f"https://{shop_domain}/admin/api/{API_VERSION}/webhooks.json",
-        json=webhook_payload,
-        headers={
-            "Content-Type": "application/json",
-            "X-Shopify-Access-Token": shopify_token
-        }
-    )
+    with track_outbound("shopify"):
+        response = requests.post(
+            f"https://{shop_domain}/admin/api/{API_VERSION}/webhooks.json",
+            json=webhook_payload,
+            headers={
+                "Content-Type": "application/json",
+                "X-Shopify-Access-Token": shopify_token
+            }
+        )
 
     if response.status_code == 201:
         print("subscription webhook created")
@@ -1,14 +1,14 @@
 import jwt
-from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, status, Depends
 from typing import Annotated
 from pydantic import BaseModel
-from jose import JWTError
 from fastapi.security import APIKeyHeader
 
 from ..config.config import Config
+from .hashing import pwd_context
 from ..accounts.constants import REFRESH_TOKEN_EXPIRE_DAYS, ACCESS_TOKEN_EXPIRE_MINUTES
+from .constants import SUBSCRIPTION_EXPIRED
 
 api_key_header = APIKeyHeader(name="Authorization", auto_error=False)
 
@@ -16,12 +16,57 @@ class TokenData(BaseModel):
     email: str | None = None
 
 
+class PlanSummary(BaseModel):
+    id: int
+    name: str | None = None
+    price: float | None = None
+    interval: str | None = None
+
+    model_config = {"from_attributes": True}
+
+
+class SubscriptionSummary(BaseModel):
+    """Snapshot of User.current_subscription cached with the principal."""
+    id: int
+    start_date: datetime | None = None
+    end_date: datetime | None = None
+    status: str | None = None
+    plan: PlanSummary | None = None
+
+    model_config = {"from_attributes": True}
+
+    @property
+    def is_expired(self) -> bool:
+        # status is maintained by the expiry sweeper, no clock comparison per request
+        return self.status == SUBSCRIPTION_EXPIRED
+
+
+class AuthenticatedUser(BaseModel):
+    """Principal resolved from an access token, used by routes instead of the ORM User."""
+    id: int
+    email: str
+    name: str | None = None
+    is_verified: bool | None = None
+    is_superuser: bool | None = False
+    current_plan_id: int | None = None
+    current_subscription_id: int | None = None
+    # Only filled by get_current_user, get_token_user builds the principal from claims alone
+    # and leaves is_superuser False
+    current_subscription: SubscriptionSummary | None = None
+
+    model_config = {"from_attributes": True}
+
+
+def token_claims(user) -> dict:
+    """Claims embedded in access/refresh tokens for the given user."""
+    # Privileges are not embedded, they could change while the token is valid
+    return {"email": user.email, "user_id": user.id}
+
+
 def get_password_hash(password: str) -> str:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     return pwd_context.hash(password)    
 
 def verify_password(plain_password, hashed_password):
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     return pwd_context.verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -38,6 +83,15 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, Config.JWT_SECRET_KEY, algorithm="HS256")
     return encoded_jwt
     
+def decode_token(token: str, credentials_exception: HTTPException) -> dict:
+    try:
+        payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=["HS256"])
+    except Exception as e:
+        raise credentials_exception
+    if payload.get("email") is None:
+        raise credentials_exception
+    return payload
+
 def verify_token(token: str, credentials_exception: HTTPException) -> TokenData:
     try:
         payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=["HS256"])
@@ -0,0 +1,132 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread safe LRU cache whose entries also expire `ttl` seconds after being set."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class CacheBackend:
+    """Async key/value cache interface shared by the in-process and Redis backends."""
+
+    async def get(self, key: str):
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str, ttl: float | None = None):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per process LRU cache with TTL eviction."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str):
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: str, ttl: float | None = None):
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key: str):
+        self._cache.delete(key)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache shared by every worker through Redis (or any Redis protocol compatible server).
+
+    Redis errors are treated as cache misses so an unavailable cache never fails a request.
+    """
+
+    def __init__(self, url: str, namespace: str, ttl: float = 3600):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str):
+        try:
+            return await self._client.get(self._key(key))
+        except Exception as e:
+            print(f"❌ Cache read failed: {e}")
+            return None
+
+    async def set(self, key: str, value: str, ttl: float | None = None):
+        try:
+            await self._client.set(self._key(key), value, ex=int(self.ttl if ttl is None else ttl))
+        except Exception as e:
+            print(f"❌ Cache write failed: {e}")
+
+    async def delete(self, key: str):
+        try:
+            await self._client.delete(self._key(key))
+        except Exception as e:
+            print(f"❌ Cache delete failed: {e}")
+
+
+class NullCacheBackend(CacheBackend):
+    """Backend used when caching is disabled."""
+
+    async def get(self, key: str):
+        return None
+
+    async def set(self, key: str, value: str, ttl: float | None = None):
+        pass
+
+    async def delete(self, key: str):
+        pass
+
+
+def build_cache_backend(backend: str, namespace: str, maxsize: int, ttl: float, redis_url: str = "") -> CacheBackend:
+    """Create the cache backend named by `backend` ("memory", "redis" or "none")."""
+    if backend == "redis":
+        return RedisCacheBackend(redis_url, namespace=namespace, ttl=ttl)
+    if backend == "memory":
+        return MemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+    return NullCacheBackend()
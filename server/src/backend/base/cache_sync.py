@@ -0,0 +1,60 @@
+import asyncio
+
+from ..config.db import get_asyncpg_dsn
+
+# Delay before reconnecting after the listening connection failed
+RECONNECT_SECONDS = 5
+
+
+class CacheInvalidationListener:
+    """LISTENs on the Postgres NOTIFY channels registered by in-process caches.
+
+    Each cache registers a handler for its channel, called with the payload of
+    every notification. Uses its own asyncpg connection rather than one from the
+    pool. While it is not listening notifications are lost, so every handler is
+    called with None each time it (re)connects and must then drop everything.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+        self._task: asyncio.Task | None = None
+
+    def register(self, channel: str, handler):
+        self._handlers[channel] = handler
+
+    async def start(self):
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def _on_notification(self, connection, pid, channel, payload):
+        self._handlers[channel](payload)
+
+    async def _listen(self):
+        import asyncpg
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(get_asyncpg_dsn())
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                for channel in self._handlers:
+                    await connection.add_listener(channel, self._on_notification)
+                for handler in self._handlers.values():
+                    handler(None)
+                await closed.wait()
+            except Exception as e:
+                print(f"❌ Cache invalidation listener failed: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+
+cache_listener = CacheInvalidationListener()
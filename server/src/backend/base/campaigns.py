@@ -0,0 +1,206 @@
+import time
+import asyncio
+from datetime import datetime
+from sqlalchemy import Select, select, update, exists, bindparam
+from sqlalchemy.dialects.postgresql import insert
+
+from ..config.config import Config
+from ..config.db import AsyncSessionLocal
+from ..config.metrics import track_outbound
+from .models import EmailCampaign, EmailCampaignRecipient
+from .email_templates import email_templates
+from .mailer import SMTPConnectionPool, smtp_pool, build_message
+
+CAMPAIGN_RUNNING = "RUNNING"
+CAMPAIGN_COMPLETED = "COMPLETED"
+
+RECIPIENT_PENDING = "PENDING"  # Claimed; if the run crashed the send outcome is unknown and it is not retried
+RECIPIENT_SENT = "SENT"
+RECIPIENT_FAILED = "FAILED"
+
+# Batches read through one server side cursor before it is reopened from the checkpoint,
+# bounds how long its read transaction stays open while a slow, rate limited send runs
+CURSOR_SEGMENT_BATCHES = 10
+
+
+class RateLimiter:
+    """Spaces acquisitions at least 1/rate seconds apart across all callers, 0 disables it."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CampaignRunner:
+    """Sends one templated email per row of `recipients`, in checkpointed batches.
+
+    `recipients` selects `source_column` labelled `source_id` (unique, the stream
+    is ordered by it), `to_email`, and the template variables. Each batch is:
+
+    1. claimed by inserting recipient rows, the (campaign, source_id) unique
+       constraint skips anyone already claimed by this or an earlier run,
+    2. rendered in one render_batch call,
+    3. sent over the pooled SMTP connections under the rate limit,
+    4. recorded together with the campaign checkpoint.
+
+    A run that crashed resumes after the last checkpoint. Recipients claimed by
+    the crashed batch stay PENDING and are never sent twice. Once a run
+    completes, the next run with the same key starts from the beginning again
+    and only reaches recipients that were not claimed yet.
+    """
+
+    def __init__(self, key: str, template_name: str, subject: str, recipients: Select, source_column,
+                 shared_context: dict | None = None, batch_size: int = Config.CAMPAIGN_BATCH_SIZE,
+                 rate_per_second: float = Config.CAMPAIGN_RATE_PER_SECOND, pool: SMTPConnectionPool = smtp_pool):
+        self.key = key
+        self.template_name = template_name
+        self.subject = subject
+        self.recipients = recipients
+        self.source_column = source_column
+        self.shared_context = shared_context or {}
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate_per_second)
+        self.pool = pool
+
+    async def run(self) -> dict:
+        campaign_id, checkpoint_id = await self._start()
+        segment_size = self.batch_size * CURSOR_SEGMENT_BATCHES
+        while True:
+            stmt = (
+                self.recipients
+                .where(self.source_column > checkpoint_id)
+                .where(~exists().where(
+                    EmailCampaignRecipient.campaign_id == campaign_id,
+                    EmailCampaignRecipient.source_id == self.source_column,
+                ))
+                .order_by(self.source_column)
+                .limit(segment_size)
+            )
+            streamed = 0
+            async with AsyncSessionLocal() as db:
+                result = await db.stream(stmt.execution_options(yield_per=self.batch_size))
+                async for rows in result.partitions():
+                    streamed += len(rows)
+                    checkpoint_id = await self._process_batch(campaign_id, rows)
+            if streamed < segment_size:
+                break
+        return await self._finish(campaign_id)
+
+    async def _start(self) -> tuple[int, int]:
+        async with AsyncSessionLocal() as db:
+            campaign = await db.scalar(select(EmailCampaign).where(EmailCampaign.key == self.key).with_for_update())
+            if campaign is None:
+                campaign = EmailCampaign(key=self.key, template_name=self.template_name, subject=self.subject,
+                                         status=CAMPAIGN_RUNNING, checkpoint_id=0, sent_count=0, failed_count=0,
+                                         started_at=datetime.utcnow())
+                db.add(campaign)
+            elif campaign.status != CAMPAIGN_RUNNING:
+                # The previous run finished, start a new pass over the recipients
+                campaign.status = CAMPAIGN_RUNNING
+                campaign.checkpoint_id = 0
+                campaign.started_at = datetime.utcnow()
+                campaign.finished_at = None
+            await db.commit()
+            return campaign.id, campaign.checkpoint_id or 0
+
+    async def _process_batch(self, campaign_id: int, rows: list) -> int:
+        checkpoint_id = rows[-1].source_id
+
+        async with AsyncSessionLocal() as db:
+            claimed = set((await db.scalars(
+                insert(EmailCampaignRecipient)
+                .values([
+                    {"campaign_id": campaign_id, "source_id": row.source_id, "to_email": row.to_email, "status": RECIPIENT_PENDING}
+                    for row in rows
+                ])
+                .on_conflict_do_nothing(constraint="uq_email_campaign_recipients_campaign_id_source_id")
+                .returning(EmailCampaignRecipient.source_id)
+            )).all())
+            await db.commit()
+        rows = [row for row in rows if row.source_id in claimed]
+
+        outcomes = {}
+        if rows:
+            bodies = await email_templates.render_batch(self.template_name, self.shared_context, [dict(row._mapping) for row in rows])
+            messages = [(row.source_id, build_message(row.to_email, self.subject, body)) for row, body in zip(rows, bodies)]
+            chunks = [messages[index::self.pool.size] for index in range(self.pool.size)]
+            await asyncio.gather(*(self._send_chunk(chunk, outcomes) for chunk in chunks if chunk))
+
+        sent = [source_id for source_id, error in outcomes.items() if error is None]
+        failed = [{"b_source_id": source_id, "b_error": error} for source_id, error in outcomes.items() if error is not None]
+        async with AsyncSessionLocal() as db:
+            if sent:
+                await db.execute(
+                    update(EmailCampaignRecipient)
+                    .where(EmailCampaignRecipient.campaign_id == campaign_id, EmailCampaignRecipient.source_id.in_(sent))
+                    .values(status=RECIPIENT_SENT)
+                )
+            if failed:
+                connection = await db.connection()
+                await connection.execute(
+                    update(EmailCampaignRecipient.__table__)
+                    .where(EmailCampaignRecipient.campaign_id == campaign_id, EmailCampaignRecipient.source_id == bindparam("b_source_id"))
+                    .values(status=RECIPIENT_FAILED, error=bindparam("b_error")),
+                    failed,
+                )
+            await db.execute(
+                update(EmailCampaign)
+                .where(EmailCampaign.id == campaign_id)
+                .values(
+                    checkpoint_id=checkpoint_id,
+                    sent_count=EmailCampaign.sent_count + len(sent),
+                    failed_count=EmailCampaign.failed_count + len(failed),
+                )
+            )
+            await db.commit()
+        return checkpoint_id
+
+    async def _send_chunk(self, messages: list, outcomes: dict):
+        import aiosmtplib
+
+        remaining = list(messages)
+        while remaining:
+            try:
+                async with self.pool.connection() as client:
+                    while remaining:
+                        source_id, message = remaining[0]
+                        await self.limiter.acquire()
+                        try:
+                            with track_outbound("smtp"):
+                                await client.send_message(message)
+                            outcomes[source_id] = None
+                        except aiosmtplib.SMTPResponseException as e:
+                            # Refused by the server, the connection is still usable
+                            outcomes[source_id] = str(e)
+                        remaining.pop(0)
+            except Exception as e:
+                # The connection failed while this message was in flight; it may have been
+                # delivered, so fail it rather than risk a duplicate and reconnect for the rest
+                source_id, _ = remaining.pop(0)
+                outcomes[source_id] = str(e)
+
+    async def _finish(self, campaign_id: int) -> dict:
+        async with AsyncSessionLocal() as db:
+            campaign = await db.scalar(select(EmailCampaign).where(EmailCampaign.id == campaign_id))
+            campaign.status = CAMPAIGN_COMPLETED
+            campaign.finished_at = datetime.utcnow()
+            await db.commit()
+            return {
+                "key": campaign.key,
+                "status": campaign.status,
+                "sent_count": campaign.sent_count,
+                "failed_count": campaign.failed_count,
+                "started_at": campaign.started_at,
+                "finished_at": campaign.finished_at,
+            }
@@ -0,0 +1,3 @@
+# Subscription states, materialized by the expiry sweeper and read by the cached principal
+SUBSCRIPTION_ACTIVE = "ACTIVE"
+SUBSCRIPTION_EXPIRED = "EXPIRED"
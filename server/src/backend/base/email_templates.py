@@ -0,0 +1,70 @@
+import os
+import asyncio
+
+from ..config.config import Config
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# Renders between two yields to the event loop in render_batch
+RENDER_BATCH_YIELD_EVERY = 100
+
+
+class EmailTemplates:
+    """Compiled Jinja2 email templates, loaded once and rendered asynchronously.
+
+    precompile() compiles every template under base/templates/ at startup; the
+    compiled code is also kept in a FileSystemBytecodeCache so other workers and
+    later cold starts skip the compile step. Templates are not re-stat'ed after
+    loading (auto_reload is off), a deploy ships new files with a new process.
+    """
+
+    def __init__(self, directory: str, bytecode_dir: str = ""):
+        self.directory = directory
+        self.bytecode_dir = bytecode_dir
+        self._env = None
+        self._templates = {}
+
+    @property
+    def env(self):
+        if self._env is None:
+            from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+            if self.bytecode_dir:
+                os.makedirs(self.bytecode_dir, exist_ok=True)
+            self._env = Environment(
+                loader=FileSystemLoader(self.directory),
+                bytecode_cache=FileSystemBytecodeCache(self.bytecode_dir or None),
+                autoescape=select_autoescape(["html"]),
+                auto_reload=False,
+                enable_async=True,
+            )
+        return self._env
+
+    def precompile(self) -> int:
+        """Compile every template so no request pays for it, returns how many were loaded."""
+        for name in self.env.list_templates():
+            self.get(name)
+        return len(self._templates)
+
+    def get(self, name: str):
+        template = self._templates.get(name)
+        if template is None:
+            template = self._templates[name] = self.env.get_template(name)
+        return template
+
+    async def render(self, name: str, context: dict) -> str:
+        return await self.get(name).render_async(context)
+
+    async def render_batch(self, name: str, shared_context: dict, recipients: list[dict]) -> list[str]:
+        """Render `name` once per recipient context, layered over the shared context."""
+        template = self.get(name)
+        bodies = []
+        for index, recipient in enumerate(recipients, 1):
+            bodies.append(await template.render_async({**shared_context, **recipient}))
+            if index % RENDER_BATCH_YIELD_EVERY == 0:
+                # Rendering is CPU only, let other tasks run during large batches
+                await asyncio.sleep(0)
+        return bodies
+
+
+email_templates = EmailTemplates(TEMPLATES_DIR, Config.EMAIL_TEMPLATE_BYTECODE_DIR)
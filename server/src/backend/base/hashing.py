@@ -0,0 +1,63 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+from ..config.config import Config
+from . import response
+
+# A single context for the whole process, building one re-parses the scheme config
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# bcrypt releases the GIL, so a small dedicated pool gives real parallelism
+# without competing with the default executor used by run_in_executor(None, ...)
+hash_executor = ThreadPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+class HashingQueue:
+    """Counts hashing jobs submitted to the executor and refuses new ones past `max_pending`."""
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise response.TooManyRequests("Too many authentication requests, please retry shortly")
+            self.pending += 1
+
+    def release(self):
+        with self._lock:
+            self.pending -= 1
+
+
+hashing_queue = HashingQueue(Config.PASSWORD_HASH_MAX_PENDING)
+
+
+async def run_hashing(func, *args):
+    """Run a CPU bound hashing call on the hashing executor, applying backpressure."""
+    hashing_queue.acquire()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(hash_executor, func, *args)
+    finally:
+        hashing_queue.release()
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except Exception as e:
+        return False
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password off the event loop."""
+    return await run_hashing(pwd_context.hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password off the event loop; malformed hashes count as a mismatch."""
+    return await run_hashing(_verify, plain_password, hashed_password)
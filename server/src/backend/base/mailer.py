@@ -0,0 +1,270 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+
+from ..config.config import Config
+from ..config.db import AsyncSessionLocal
+from ..config.metrics import track_outbound
+from .models import EmailDeadLetter
+from .email_templates import email_templates
+
+# How long stop() lets the workers drain the queue before dead-lettering what is left
+SHUTDOWN_GRACE_SECONDS = 5
+
+
+def build_message(to_email: str, subject: str, body: str) -> EmailMessage:
+    """HTML email from the configured sender."""
+    message = EmailMessage()
+    message["From"] = Config.SMTP_EMAIL
+    message["To"] = to_email
+    message["Subject"] = subject
+    message.set_content(body, subtype="html")
+    return message
+
+
+class OutboundEmail:
+    """A templated email waiting in the queue."""
+
+    __slots__ = ("to_email", "subject", "template_name", "template_data", "attempts")
+
+    def __init__(self, to_email: str, subject: str, template_name: str, template_data: dict):
+        self.to_email = to_email
+        self.subject = subject
+        self.template_name = template_name
+        self.template_data = template_data
+        self.attempts = 0
+
+
+class SMTPConnectionPool:
+    """Bounded pool of authenticated SMTP connections kept open between messages.
+
+    Connections are opened on demand, reused while they are connected and younger
+    than `max_idle` seconds of inactivity, and dropped after any connection level
+    error so the next checkout reconnects.
+    """
+
+    def __init__(self, size: int, hostname: str, port: int, username: str, password: str,
+                 start_tls: bool, timeout: float, max_idle: float):
+        self.size = size
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._semaphore = asyncio.Semaphore(size)
+        self._idle = []
+
+    async def _connect(self):
+        import aiosmtplib
+
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            # connect() logs in when a username is given, local stand-ins run without a password or auth
+            username=self.username if self.password else None,
+            password=self.password or None,
+            start_tls=self.start_tls,
+            timeout=self.timeout,
+        )
+        with track_outbound("smtp"):
+            await client.connect()
+        return client
+
+    @staticmethod
+    def _discard(client):
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    async def _checkout(self):
+        while self._idle:
+            client, last_used = self._idle.pop()
+            if client.is_connected and time.monotonic() - last_used < self.max_idle:
+                return client
+            self._discard(client)
+        return await self._connect()
+
+    @asynccontextmanager
+    async def connection(self):
+        async with self._semaphore:
+            client = await self._checkout()
+            try:
+                yield client
+            except BaseException:
+                self._discard(client)
+                raise
+            self._idle.append((client, time.monotonic()))
+
+    async def close(self):
+        while self._idle:
+            client, _ = self._idle.pop()
+            try:
+                await client.quit()
+            except Exception:
+                self._discard(client)
+
+
+class EmailQueue:
+    """In-process outbound email queue drained by a few sending workers.
+
+    Each worker takes up to `batch_size` queued emails and sends them over one
+    pooled connection. Failed emails are retried with exponential backoff; after
+    `max_attempts`, or when they cannot be queued or sent before shutdown, they
+    are stored in the email_dead_letters table.
+    """
+
+    def __init__(self, pool: SMTPConnectionPool, queue_size: int, batch_size: int,
+                 max_attempts: int, retry_base_seconds: float):
+        self.pool = pool
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._retries: dict[asyncio.Task, OutboundEmail] = {}
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.pool.size)]
+
+    async def stop(self):
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=SHUTDOWN_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        tasks = self._tasks + list(self._retries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        unsent = list(self._retries.values())
+        while not self._queue.empty():
+            unsent.append(self._queue.get_nowait())
+        if unsent:
+            await self._dead_letter(unsent, "Not sent before shutdown")
+        self._tasks = []
+        self._retries = {}
+        self._queue = None
+        await self.pool.close()
+
+    async def enqueue(self, to_email: str, subject: str, template_name: str, template_data: dict) -> bool:
+        """Queue an email for delivery without waiting for SMTP.
+
+        Returns False when the email was not queued. A queue that was never
+        started (no lifespan) fails fast without touching the database; when the
+        queue is full the email goes straight to the dead letter table.
+        """
+        if self._queue is None:
+            print(f"❌ Email queue is not running, '{subject}' to {to_email} was not sent")
+            return False
+        email = OutboundEmail(to_email, subject, template_name, template_data)
+        if self._queue.full():
+            await self._dead_letter([email], "Email queue is full")
+            return False
+        self._queue.put_nowait(email)
+        return True
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._send_batch(batch)
+            except Exception as e:
+                print(f"❌ Email batch crashed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    async def _build_message(email: OutboundEmail) -> EmailMessage:
+        body = await email_templates.render(email.template_name, email.template_data)
+        return build_message(email.to_email, email.subject, body)
+
+    async def _send_batch(self, batch: list[OutboundEmail]):
+        import aiosmtplib
+
+        pending = list(batch)
+        try:
+            async with self.pool.connection() as client:
+                while pending:
+                    email = pending[0]
+                    try:
+                        message = await self._build_message(email)
+                    except Exception as e:
+                        # A broken template will not render on a retry either
+                        pending.pop(0)
+                        await self._dead_letter([email], f"Rendering failed: {e}")
+                        continue
+                    try:
+                        with track_outbound("smtp"):
+                            await client.send_message(message)
+                    except aiosmtplib.SMTPResponseException as e:
+                        # The server refused this message, the connection is still usable
+                        pending.pop(0)
+                        await self._failed(email, e)
+                        continue
+                    pending.pop(0)
+        except Exception as e:
+            # Connecting or the connection itself failed, the pool already dropped it
+            for email in pending:
+                await self._failed(email, e)
+
+    async def _failed(self, email: OutboundEmail, error: Exception):
+        email.attempts += 1
+        if email.attempts >= self.max_attempts:
+            await self._dead_letter([email], str(error))
+            return
+        delay = self.retry_base_seconds * 2 ** (email.attempts - 1)
+        task = asyncio.create_task(self._retry_later(email, delay))
+        self._retries[task] = email
+        task.add_done_callback(lambda done: self._retries.pop(done, None))
+
+    async def _retry_later(self, email: OutboundEmail, delay: float):
+        await asyncio.sleep(delay)
+        await self._queue.put(email)
+
+    async def _dead_letter(self, emails: list[OutboundEmail], error: str):
+        try:
+            async with AsyncSessionLocal() as db:
+                db.add_all([
+                    EmailDeadLetter(
+                        to_email=email.to_email,
+                        subject=email.subject,
+                        template_name=email.template_name,
+                        template_data=email.template_data,
+                        attempts=email.attempts,
+                        error=error,
+                    )
+                    for email in emails
+                ])
+                await db.commit()
+        except Exception as e:
+            print(f"❌ Failed to store {len(emails)} undelivered email(s): {e}")
+
+
+smtp_pool = SMTPConnectionPool(
+    size=Config.SMTP_POOL_SIZE,
+    hostname=Config.SMTP_SERVER,
+    port=Config.SMTP_PORT,
+    username=Config.SMTP_EMAIL,
+    password=Config.SMTP_PASSWORD,
+    start_tls=Config.SMTP_START_TLS,
+    timeout=Config.SMTP_TIMEOUT_SECONDS,
+    max_idle=Config.SMTP_MAX_IDLE_SECONDS,
+)
+
+email_queue = EmailQueue(
+    pool=smtp_pool,
+    queue_size=Config.EMAIL_QUEUE_SIZE,
+    batch_size=Config.EMAIL_BATCH_SIZE,
+    max_attempts=Config.EMAIL_MAX_ATTEMPTS,
+    retry_base_seconds=Config.EMAIL_RETRY_BASE_SECONDS,
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey, UniqueConstraint
 from datetime import datetime
 from ..config.db import Base
 
@@ -11,4 +11,44 @@ class TimeStampedModel(Base):
     is_deleted = Column(Boolean, default=False)
 
 
+class EmailDeadLetter(TimeStampedModel):
+    """Outbound email given up on by the email queue, kept so it can be inspected or resent."""
+    __tablename__ = "email_dead_letters"
 
+    to_email = Column(String, nullable=False, index=True)
+    subject = Column(String, nullable=False)
+    template_name = Column(String, nullable=False)
+    template_data = Column(JSON, nullable=True)
+    attempts = Column(Integer, default=0)
+    error = Column(String, nullable=True)
+
+
+class EmailCampaign(TimeStampedModel):
+    """A bulk email run, resumable from `checkpoint_id` after a crash."""
+    __tablename__ = "email_campaigns"
+
+    key = Column(String, nullable=False, unique=True)
+    template_name = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    # Highest source id of the last fully processed batch of the current run
+    checkpoint_id = Column(Integer, default=0)
+    sent_count = Column(Integer, default=0)
+    failed_count = Column(Integer, default=0)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class EmailCampaignRecipient(TimeStampedModel):
+    """One recipient of a campaign; the unique constraint is what prevents a double send."""
+    __tablename__ = "email_campaign_recipients"
+
+    campaign_id = Column(Integer, ForeignKey("email_campaigns.id"), nullable=False)
+    source_id = Column(Integer, nullable=False)  # Id of the row the recipient was selected from, e.g. a subscription
+    to_email = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    error = Column(String, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("campaign_id", "source_id", name="uq_email_campaign_recipients_campaign_id_source_id"),
+    )
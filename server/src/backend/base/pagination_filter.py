@@ -1,6 +1,14 @@
+import json
+import base64
+from datetime import datetime
 from typing import TypeVar, List, Dict, Any, Optional
 from fastapi import Query
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import Select, func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import response
 
 T = TypeVar("T", bound=BaseModel)
 
@@ -9,6 +17,8 @@ class PaginationAndSortingOptions(BaseModel):
     offset: int = Query(0, ge=0)
     sort_by: Optional[str] = Query(None, description="Field to sort by")
     sort_order: str = Query("asc", regex="^(asc|desc)$", description="Sort order (asc or desc)")
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, replaces offset")
+    count: str = Query("exact", regex="^(exact|estimated|none)$", description="How total_count is computed")
 
 
 def queryset_pagination(
@@ -45,3 +55,151 @@ def sort_queryset(data: List[T], options: PaginationAndSortingOptions) -> List[T
     return data
 
 
+class KeysetPaginationOptions(BaseModel):
+    limit: int = Query(20, ge=1, le=100)
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor by the previous page")
+
+
+def encode_cursor(values: tuple) -> str:
+    """Encode the sort key of the last row of a page into an opaque cursor."""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, parsers: tuple) -> tuple:
+    """Decode a cursor made by encode_cursor, applying one parser per key column."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(parsers):
+            raise ValueError("cursor length mismatch")
+        return tuple(parser(value) for parser, value in zip(parsers, values))
+    except Exception:
+        raise response.BadRequest("Invalid cursor")
+
+
+def keyset_paginate(stmt: Select, key_columns: tuple, parsers: tuple, options: KeysetPaginationOptions, descending: bool = True) -> Select:
+    """Order `stmt` by `key_columns` and seek past the cursor instead of using OFFSET.
+
+    The key columns must be unique together (end them with the primary key). One
+    extra row is fetched so keyset_page can tell whether another page exists.
+    """
+    if options.cursor:
+        values = decode_cursor(options.cursor, parsers)
+        key = tuple_(*key_columns)
+        stmt = stmt.where(key < tuple_(*values) if descending else key > tuple_(*values))
+    order_by = [column.desc() if descending else column.asc() for column in key_columns]
+    return stmt.order_by(*order_by).limit(options.limit + 1)
+
+
+def keyset_page(rows: list, key_names: tuple, options: KeysetPaginationOptions) -> Dict[str, Any]:
+    """Build the page response for rows fetched with keyset_paginate, ensuring data is JSON serializable."""
+    has_more = len(rows) > options.limit
+    rows = rows[:options.limit]
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(tuple(getattr(rows[-1], name) for name in key_names))
+    return {
+        "data": jsonable_encoder([dict(row._mapping) if hasattr(row, "_mapping") else row for row in rows]),
+        "limit": options.limit,
+        "next_cursor": next_cursor,
+    }
+
+
+def filter_select(stmt: Select, filters: BaseModel, column_map: Dict[str, Any]) -> Select:
+    """SQL equivalent of filter_queryset: one WHERE clause per provided filter.
+
+    `column_map` maps filter field names to a column (compared for equality) or to a
+    callable returning a clause for the value. Fields missing from the map are ignored.
+    """
+    for key, value in filters.model_dump(exclude_none=True).items():
+        target = column_map.get(key)
+        if target is None:
+            continue
+        stmt = stmt.where(target == value if hasattr(target, "key") else target(value))
+    return stmt
+
+
+def _sort_column(options: PaginationAndSortingOptions, sort_columns: Dict[str, Any], default_sort):
+    if options.sort_by is None:
+        return default_sort
+    if options.sort_by not in sort_columns:
+        raise response.BadRequest(f"Cannot sort by {options.sort_by}")
+    return sort_columns[options.sort_by]
+
+
+def _cursor_parser(column):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return lambda value: value
+    return datetime.fromisoformat if python_type is datetime else python_type
+
+
+def sort_select(stmt: Select, options: PaginationAndSortingOptions, sort_columns: Dict[str, Any], id_column, default_sort=None) -> Select:
+    """SQL equivalent of sort_queryset, restricted to the whitelisted `sort_columns`.
+
+    The primary key is appended as a tie breaker so the order is deterministic.
+    """
+    column = _sort_column(options, sort_columns, default_sort if default_sort is not None else id_column)
+    descending = options.sort_order == "desc"
+    order_by = [column.desc(), id_column.desc()] if descending else [column.asc(), id_column.asc()]
+    return stmt.order_by(*order_by)
+
+
+async def count_select(db: AsyncSession, stmt: Select, mode: str = "exact") -> Optional[int]:
+    """Row count of `stmt`: exact COUNT(*), the planner's estimate, or None."""
+    if mode == "none":
+        return None
+    stmt = stmt.order_by(None).limit(None).offset(None)
+    if mode == "estimated":
+        try:
+            compiled = stmt.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+            plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except Exception:
+            # Some bind values cannot be rendered inline, fall back to an exact count
+            pass
+    return await db.scalar(select(func.count()).select_from(stmt.subquery()))
+
+
+async def paginate_select(
+    db: AsyncSession,
+    stmt: Select,
+    options: PaginationAndSortingOptions,
+    sort_columns: Dict[str, Any],
+    id_column,
+    default_sort=None,
+    scalars: bool = True,
+) -> Dict[str, Any]:
+    """SQL equivalent of queryset_pagination + sort_queryset.
+
+    Sorting, LIMIT/OFFSET and the count run in the database. Every page also carries
+    a `next_cursor`; passing it back as `cursor` switches to keyset pagination,
+    which stays fast on deep pages. Sort columns used with cursors must be non null.
+    """
+    column = _sort_column(options, sort_columns, default_sort if default_sort is not None else id_column)
+    descending = options.sort_order == "desc"
+    total_count = await count_select(db, stmt, options.count)
+
+    if options.cursor:
+        page_stmt = keyset_paginate(stmt, (column, id_column), (_cursor_parser(column), _cursor_parser(id_column)), options, descending)
+    else:
+        page_stmt = sort_select(stmt, options, sort_columns, id_column, default_sort).limit(options.limit + 1).offset(options.offset)
+
+    result = await db.execute(page_stmt)
+    rows = result.scalars().all() if scalars else result.all()
+    has_more = len(rows) > options.limit
+    rows = rows[:options.limit]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor((getattr(last, column.key), getattr(last, id_column.key)))
+    return {
+        "total_count": total_count,
+        "data": jsonable_encoder(rows),
+        "limit": options.limit,
+        "offset": options.offset,
+        "next_cursor": next_cursor,
+    }
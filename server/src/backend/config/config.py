@@ -2,6 +2,73 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     DATABASE_URL: str 
+    ASYNC_DATABASE_URL: str = ""
+
+    # Connection pool sizing, applied per engine and per worker process
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # In seconds
+    DB_POOL_RECYCLE: int = 1800  # In seconds, -1 disables recycling
+    DB_POOL_PRE_PING: bool = True
+    # Run Base.metadata.create_all at startup, off by default: the schema is managed by Alembic migrations
+    DB_AUTO_CREATE_TABLES: bool = False
+
+    # Authenticated user cache (per worker process)
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_SIZE: int = 10000
+
+    # OpenAI, OPENAI_BASE_URL can point at a compatible local stub server
+    OPENAI_API_KEY: str = ""
+    OPENAI_BASE_URL: str = ""
+    OPENAI_MODEL: str = "gpt-3.5-turbo"
+    OPENAI_TIMEOUT_SECONDS: int = 60
+
+    # Resume optimization result cache: "memory", "redis" or "none"
+    OPTIMIZE_CACHE_BACKEND: str = "memory"
+    OPTIMIZE_CACHE_TTL_SECONDS: int = 86400
+    OPTIMIZE_CACHE_MAX_ENTRIES: int = 1000
+    REDIS_URL: str = ""
+
+    # Background resume optimization jobs
+    OPTIMIZE_JOB_WORKERS: int = 4  # Concurrent optimizations per process
+    OPTIMIZE_JOB_QUEUE_SIZE: int = 1000
+    OPTIMIZE_JOB_MAX_ATTEMPTS: int = 3
+    OPTIMIZE_JOB_LEASE_SECONDS: int = 600  # Longer than one optimization, then another process may take the job over
+
+    # Public subscription plan catalog
+    PLAN_CATALOG_CACHE_TTL_SECONDS: int = 300  # App writes reach every worker through NOTIFY, this bounds changes made elsewhere
+    PLAN_CATALOG_MAX_AGE_SECONDS: int = 60  # Cache-Control max-age sent to clients
+
+    # Password hashing executor
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Hashing jobs queued or running before returning 429
+
+    # Outbound email: SMTP connection pool and delivery queue
+    SMTP_START_TLS: bool = True  # Local stand-ins such as aiosmtpd usually need False
+    SMTP_TIMEOUT_SECONDS: int = 30
+    SMTP_POOL_SIZE: int = 2  # Long lived connections, also the number of sending workers
+    SMTP_MAX_IDLE_SECONDS: int = 240  # Idle connections are reopened, relays drop them after a few minutes
+    EMAIL_QUEUE_SIZE: int = 10000
+    EMAIL_BATCH_SIZE: int = 20  # Messages sent over one connection before it goes back to the pool
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BASE_SECONDS: float = 2  # Backoff doubles after every failed attempt
+    EMAIL_TEMPLATE_BYTECODE_DIR: str = ""  # Compiled template cache, empty uses a directory under the system temp dir
+
+    # Bulk email campaigns
+    CAMPAIGN_BATCH_SIZE: int = 500  # Recipients claimed, rendered and checkpointed together
+    CAMPAIGN_RATE_PER_SECOND: float = 10  # Across all SMTP connections, 0 disables the limit
+    EXPIRY_REMINDER_DAYS: int = 3
+
+    # Subscription expiry sweeper, one process at a time holds the Postgres advisory lock
+    SUBSCRIPTION_SWEEP_INTERVAL_SECONDS: int = 60  # 0 disables the sweeper in this process
+    SUBSCRIPTION_SWEEP_BATCH_SIZE: int = 1000  # Subscriptions expired per UPDATE and transaction
+
+    # Operational endpoints (/metrics, /pool-stats) require "Authorization: Bearer <METRICS_TOKEN>", unset disables them
+    METRICS_TOKEN: str = ""
+
+    # Logging
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SAMPLE_RATE: int = 1  # Log 1 in N successful requests, errors are always logged
     SESSION_SECRET_KEY: str
     JWT_SECRET_KEY: str
     CORS_ORIGINS: list[str]
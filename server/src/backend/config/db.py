@@ -1,15 +1,46 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 
 from ..config.config import Config
+from .pool import TimedQueuePool, TimedAsyncAdaptedQueuePool, pool_stats
 
 
-print(Config.DATABASE_URL)
+def get_async_database_url() -> str:
+    """Return the asyncpg flavour of the configured database url."""
+    if Config.ASYNC_DATABASE_URL:
+        return Config.ASYNC_DATABASE_URL
+    url = Config.DATABASE_URL
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
 
-engine = create_engine(Config.DATABASE_URL, echo=False, pool_pre_ping=True)
+
+def get_asyncpg_dsn() -> str:
+    """Plain postgresql:// dsn for asyncpg connections opened outside the pool."""
+    return make_url(get_async_database_url()).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def get_pool_options() -> dict:
+    """Return the connection pool keyword arguments shared by both engines."""
+    return {
+        "pool_size": Config.DB_POOL_SIZE,
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "pool_timeout": Config.DB_POOL_TIMEOUT,
+        "pool_recycle": Config.DB_POOL_RECYCLE,
+        "pool_pre_ping": Config.DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(Config.DATABASE_URL, echo=False, poolclass=TimedQueuePool, **get_pool_options())
 SessionLocal = sessionmaker(bind=engine, class_=Session, expire_on_commit=False)
 
+async_engine = create_async_engine(get_async_database_url(), echo=False, poolclass=TimedAsyncAdaptedQueuePool, **get_pool_options())
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -17,4 +48,15 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_pool_stats() -> dict:
+    """Return pool usage for the sync and async engines."""
+    return {
+        "sync": pool_stats(engine.pool, Config.DB_MAX_OVERFLOW),
+        "async": pool_stats(async_engine.pool, Config.DB_MAX_OVERFLOW),
+    }
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
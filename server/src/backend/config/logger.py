@@ -1,36 +1,91 @@
 import sys
+import json
 import time
+import queue
+import atexit
 import logging
+import itertools
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from fastapi import FastAPI, Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import Config
 
 # Log file path
 LOG_FILE = Path("/opt/logs/billingsubs.log")
 
+# Structured fields copied from `extra=` into the JSON document when present
+STRUCTURED_FIELDS = ("method", "path", "status", "latency_ms", "user_id", "request_body", "response_body")
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single line JSON document."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        document = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                document[field] = value
+        if record.exc_info:
+            document["exception"] = self.formatException(record.exc_info)
+        return json.dumps(document, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
 # Configure logger
 logger = logging.getLogger("billing_subs")
 logger.setLevel(logging.INFO)
 
 # Log format
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+formatter = JsonFormatter()
+
+# Handlers doing the actual I/O run on the QueueListener's background thread
+output_handlers = []
 
 # Rotating file handler
 try:
     file_handler = RotatingFileHandler(LOG_FILE, maxBytes=10*1024*1024, backupCount=5)  # 10 MB per file, keep 5 backups
     file_handler.setLevel(logging.INFO)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    output_handlers.append(file_handler)
 except Exception as e:
-    logger.error(f"Failed to create log file handler: {e}")
+    sys.stderr.write(f"Failed to create log file handler: {e}\n")
 
 # Console handler (set to WARNING in production to reduce noise)
 console_handler = logging.StreamHandler(sys.stdout)
 console_handler.setLevel(logging.INFO)  # Change to WARNING in production
 console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+output_handlers.append(console_handler)
+
+# Request path only enqueues records, the listener thread writes them out
+log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+queue_handler = DroppingQueueHandler(log_queue)
+logger.addHandler(queue_handler)
+
+log_listener = QueueListener(log_queue, *output_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 class StreamToLogger:
     def __init__(self, logger, log_level=logging.INFO):
@@ -53,46 +108,96 @@ sys.stdout = StreamToLogger(logger, logging.INFO)
 sys.stderr = StreamToLogger(logger, logging.ERROR)
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware to log requests and responses"""
-
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+# Only the first LOG_CAPTURE_BYTES of each request/response body are kept for logging
+LOG_CAPTURE_BYTES = 500
 
-        headers = dict(request.headers)
-        body = await request.body()
-        body_text = body.decode()[:500] if body else "No Body"  # Limit body size for logging
 
+class BoundedCapture:
+    """Keeps a copy of the first `limit` bytes of a streamed body and drops the rest."""
 
-        response = await call_next(request)
-        process_time = time.time() - start_time
+    def __init__(self, limit: int = LOG_CAPTURE_BYTES):
+        self.limit = limit
+        self.size = 0
+        self.truncated = False
+        self._chunks = []
 
-        # Read response body properly
-        response_body = b""
-        async for chunk in response.body_iterator:
-            response_body += chunk
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        remaining = self.limit - self.size
+        if remaining <= 0:
+            self.truncated = True
+            return
+        if len(chunk) > remaining:
+            chunk = chunk[:remaining]
+            self.truncated = True
+        self._chunks.append(chunk)
+        self.size += len(chunk)
 
-        # Define an async generator for the response body
-        async def response_body_generator():
-            yield response_body
+    def text(self) -> str:
+        if not self._chunks:
+            return "No Body"
+        text = b"".join(self._chunks).decode(errors="replace")
+        return f"{text}..." if self.truncated else text
 
-        # Create a new response with the modified body
-        new_response = Response(
-            content=response_body,
-            status_code=response.status_code,
-            headers=dict(response.headers),
-            media_type=response.media_type,
-        )
 
-        line_break = "=" * 100
+class LoggingMiddleware:
+    """Middleware to log requests and responses.
 
-        bold = "\033[1m"
-        reset = "\033[0m"
+    Implemented as a plain ASGI middleware so request and response bodies are
+    streamed through untouched; only a bounded prefix is captured for the log.
+    """
 
-        response_body = response_body.decode()[:500] if response_body else "No Body"
+    def __init__(self, app: ASGIApp, capture_bytes: int = LOG_CAPTURE_BYTES, sample_rate: int = Config.LOG_SAMPLE_RATE):
+        self.app = app
+        self.capture_bytes = capture_bytes
+        self.sample_rate = sample_rate
+        self._counter = itertools.count()
 
-        logger.info(
-            f"\n {line_break} \n {bold} Request: {reset} {request.method} {request.url} \n {bold} Headers: {reset} {headers} \n {bold} Body: {reset} {body_text} \n {bold} Response Body: {reset} {response_body}"
-        )        
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        return new_response
+        start_time = time.time()
+        request_body = BoundedCapture(self.capture_bytes)
+        response_body = BoundedCapture(self.capture_bytes)
+        response_status = {"code": 500}
+
+        async def receive_with_capture() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                request_body.feed(message.get("body", b""))
+            return message
+
+        async def send_with_capture(message: Message):
+            if message["type"] == "http.response.start":
+                response_status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response_body.feed(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_with_capture, send_with_capture)
+        finally:
+            latency_ms = round((time.time() - start_time) * 1000, 2)
+            status_code = response_status["code"]
+            if status_code >= 400 or self.should_sample():
+                logger.info(
+                    "request",
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "latency_ms": latency_ms,
+                        "user_id": scope.get("state", {}).get("user_id"),
+                        "request_body": request_body.text(),
+                        "response_body": response_body.text(),
+                    },
+                )
+
+    def should_sample(self) -> bool:
+        """Log 1 in `sample_rate` successful requests; errors are always logged."""
+        if self.sample_rate <= 1:
+            return True
+        return next(self._counter) % self.sample_rate == 0
@@ -0,0 +1,152 @@
+import time
+import threading
+from contextvars import ContextVar
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Upper bounds (in seconds) of the checkout wait and connect time histogram buckets
+WAIT_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Seconds spent opening new connections during the current checkout. Context local, so
+# it is per thread for the sync pool and per task for the async one
+_checkout_connect_seconds: ContextVar[float] = ContextVar("checkout_connect_seconds", default=0.0)
+
+
+class PoolWaitHistogram:
+    """Cumulative histogram of checkout durations (waiting on the pool, or connecting)."""
+
+    def __init__(self, buckets=WAIT_TIME_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * len(self.buckets)
+        self._count = 0
+        self._sum = 0.0
+        self._timeouts = 0
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._count += 1
+            self._sum += seconds
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self._counts[index] += 1
+
+    def observe_timeout(self):
+        with self._lock:
+            self._timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "buckets": {str(bound): count for bound, count in zip(self.buckets, self._counts)},
+                "count": self._count,
+                "sum": self._sum,
+                "timeouts": self._timeouts,
+            }
+
+
+class TimedCheckoutMixin:
+    """Records how long each checkout waited on the pool before getting a connection.
+
+    Opening a new connection (connect, TLS and auth handshakes) is recorded in
+    connect_histogram and subtracted from the wait, which only keeps the time spent
+    blocked on the pool queue.
+    """
+
+    wait_histogram: PoolWaitHistogram
+    connect_histogram: PoolWaitHistogram
+
+    def _do_get(self):
+        token = _checkout_connect_seconds.set(0.0)
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_histogram.observe_timeout()
+            raise
+        finally:
+            connect_seconds = _checkout_connect_seconds.get()
+            _checkout_connect_seconds.reset(token)
+        self.wait_histogram.observe(max(time.perf_counter() - start - connect_seconds, 0.0))
+        return connection
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            elapsed = time.perf_counter() - start
+            self.connect_histogram.observe(elapsed)
+            _checkout_connect_seconds.set(_checkout_connect_seconds.get() + elapsed)
+
+
+# The histogram lives on the class so it survives pool.recreate() after invalidation
+class TimedQueuePool(TimedCheckoutMixin, QueuePool):
+    wait_histogram = PoolWaitHistogram()
+    connect_histogram = PoolWaitHistogram()
+
+
+class TimedAsyncAdaptedQueuePool(TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    wait_histogram = PoolWaitHistogram()
+    connect_histogram = PoolWaitHistogram()
+
+
+def pool_stats(pool, max_overflow: int) -> dict:
+    """Return a point-in-time snapshot of a QueuePool's usage, `max_overflow` as configured."""
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": max_overflow,
+        "timeout": pool.timeout(),
+        "wait_time": pool.wait_histogram.snapshot() if hasattr(pool, "wait_histogram") else None,
+        "connect_time": pool.connect_histogram.snapshot() if hasattr(pool, "connect_histogram") else None,
+    }
+
+
+def pool_metric_lines(stats_by_engine: dict) -> list[str]:
+    """Render pool snapshots (as returned by pool_stats) in the Prometheus text format."""
+    gauges = {
+        "db_pool_size": ("size", "Configured number of persistent connections"),
+        "db_pool_checked_in": ("checked_in", "Idle connections in the pool"),
+        "db_pool_checked_out": ("checked_out", "Connections currently checked out"),
+        "db_pool_overflow": ("overflow", "Overflow connections currently open"),
+    }
+    lines = []
+    for metric_name, (key, documentation) in gauges.items():
+        lines.append(f"# HELP {metric_name} {documentation}")
+        lines.append(f"# TYPE {metric_name} gauge")
+        for engine_name, stats in stats_by_engine.items():
+            lines.append(f'{metric_name}{{engine="{engine_name}"}} {stats[key]}')
+
+    lines.append("# HELP db_pool_wait_seconds Time spent waiting for a pooled connection")
+    lines.append("# TYPE db_pool_wait_seconds histogram")
+    for engine_name, stats in stats_by_engine.items():
+        wait_time = stats["wait_time"]
+        if not wait_time:
+            continue
+        for bound, count in wait_time["buckets"].items():
+            lines.append(f'db_pool_wait_seconds_bucket{{engine="{engine_name}",le="{bound}"}} {count}')
+        lines.append(f'db_pool_wait_seconds_bucket{{engine="{engine_name}",le="+Inf"}} {wait_time["count"]}')
+        lines.append(f'db_pool_wait_seconds_count{{engine="{engine_name}"}} {wait_time["count"]}')
+        lines.append(f'db_pool_wait_seconds_sum{{engine="{engine_name}"}} {wait_time["sum"]}')
+
+    lines.append("# HELP db_pool_connect_seconds Time spent opening new pooled connections")
+    lines.append("# TYPE db_pool_connect_seconds histogram")
+    for engine_name, stats in stats_by_engine.items():
+        connect_time = stats["connect_time"]
+        if not connect_time:
+            continue
+        for bound, count in connect_time["buckets"].items():
+            lines.append(f'db_pool_connect_seconds_bucket{{engine="{engine_name}",le="{bound}"}} {count}')
+        lines.append(f'db_pool_connect_seconds_bucket{{engine="{engine_name}",le="+Inf"}} {connect_time["count"]}')
+        lines.append(f'db_pool_connect_seconds_count{{engine="{engine_name}"}} {connect_time["count"]}')
+        lines.append(f'db_pool_connect_seconds_sum{{engine="{engine_name}"}} {connect_time["sum"]}')
+
+    lines.append("# HELP db_pool_timeouts_total Checkouts that gave up after pool_timeout")
+    lines.append("# TYPE db_pool_timeouts_total counter")
+    for engine_name, stats in stats_by_engine.items():
+        if stats["wait_time"]:
+            lines.append(f'db_pool_timeouts_total{{engine="{engine_name}"}} {stats["wait_time"]["timeouts"]}')
+    return lines
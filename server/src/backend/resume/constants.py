@@ -0,0 +1,8 @@
+# Resume optimization job states
+JOB_PENDING = "PENDING"
+JOB_RUNNING = "RUNNING"
+JOB_SUCCEEDED = "SUCCEEDED"
+JOB_FAILED = "FAILED"
+
+# Maximum number of resumes accepted by a single POST /resume/bulk
+RESUME_BULK_MAX_ITEMS = 5000
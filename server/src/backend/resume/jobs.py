@@ -0,0 +1,164 @@
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func, or_, and_
+
+from ..config.config import Config
+from ..config.db import AsyncSessionLocal
+from ..base import response
+from .models import ResumeOptimizationJob
+from .constants import JOB_PENDING, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED
+from .services import get_resume_prompt_data, generate_optimized_resume
+
+
+class OptimizationJobQueue:
+    """In-process worker pool that runs resume optimizations outside the request.
+
+    Job state lives in the resume_optimization_jobs table, the asyncio queue only
+    carries job ids. A worker claims a job with a conditional UPDATE that takes a
+    lease (locked_until), so when several processes queue the same job only one
+    runs it. On start() a process picks up PENDING jobs and RUNNING jobs whose
+    lease expired, i.e. whose worker died.
+    """
+
+    def __init__(self, workers: int, queue_size: int, max_attempts: int, lease_seconds: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._retries: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _claimable(now: datetime):
+        return or_(
+            ResumeOptimizationJob.status == JOB_PENDING,
+            and_(
+                ResumeOptimizationJob.status == JOB_RUNNING,
+                or_(ResumeOptimizationJob.locked_until.is_(None), ResumeOptimizationJob.locked_until < now),
+            ),
+        )
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        async with AsyncSessionLocal() as db:
+            job_ids = (await db.scalars(
+                select(ResumeOptimizationJob.job_id)
+                .where(self._claimable(datetime.utcnow()))
+                .order_by(ResumeOptimizationJob.id)
+                .limit(self.queue_size)
+            )).all()
+        for job_id in job_ids:
+            self._queue.put_nowait(job_id)
+
+    async def stop(self):
+        tasks = self._tasks + list(self._retries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Jobs waiting for a retry stay PENDING and are picked up by the next start()
+        self._tasks = []
+        self._retries = set()
+
+    async def submit(self, db, resume_id: int, user_id: int, job_description: str) -> ResumeOptimizationJob:
+        """Persist a new job and queue it; raises 429 when the queue is full."""
+        if self._queue is None:
+            raise response.InternalServerError("Optimization workers are not running")
+        if self._queue.full():
+            raise response.TooManyRequests("Too many optimizations in progress, please retry shortly")
+        job = ResumeOptimizationJob(
+            job_id=uuid.uuid4().hex,
+            resume_id=resume_id,
+            user_id=user_id,
+            job_description=job_description,
+            status=JOB_PENDING,
+            attempts=0,
+        )
+        db.add(job)
+        await db.commit()
+        self._queue.put_nowait(job.job_id)
+        return job
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"❌ Optimization job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        now = datetime.utcnow()
+        lease = now + timedelta(seconds=self.lease_seconds)
+        # Claiming, loading the resume and recording the outcome each use a short session,
+        # no pooled connection is held while the model runs
+        resume = error = None
+        async with AsyncSessionLocal() as db:
+            job = await db.scalar(
+                update(ResumeOptimizationJob)
+                .where(ResumeOptimizationJob.job_id == job_id, self._claimable(now))
+                .values(
+                    status=JOB_RUNNING,
+                    attempts=func.coalesce(ResumeOptimizationJob.attempts, 0) + 1,
+                    locked_until=lease,
+                )
+                .returning(ResumeOptimizationJob)
+            )
+            await db.commit()
+            if not job:
+                # Finished, or claimed by another worker or process
+                return
+            try:
+                resume = await get_resume_prompt_data(db, job.resume_id, job.user_id)
+            except Exception as e:
+                error = str(e)
+
+        result = None
+        if resume is not None:
+            try:
+                result = await generate_optimized_resume(resume, job.job_description)
+            except Exception as e:
+                error = str(e)
+        await self._finish(job, lease, result, error)
+
+    async def _finish(self, job: ResumeOptimizationJob, lease: datetime, result: str | None, error: str | None):
+        """Record the outcome of a run, unless its lease expired and another worker took the job over."""
+        values = {"error": error, "locked_until": None}
+        if error is None:
+            values.update(status=JOB_SUCCEEDED, result=result)
+        elif job.attempts < self.max_attempts:
+            values.update(status=JOB_PENDING)
+        else:
+            values.update(status=JOB_FAILED)
+        async with AsyncSessionLocal() as db:
+            recorded = await db.scalar(
+                update(ResumeOptimizationJob)
+                .where(
+                    ResumeOptimizationJob.job_id == job.job_id,
+                    ResumeOptimizationJob.status == JOB_RUNNING,
+                    ResumeOptimizationJob.locked_until == lease,
+                )
+                .values(**values)
+                .returning(ResumeOptimizationJob.id)
+            )
+            await db.commit()
+        if recorded and values["status"] == JOB_PENDING:
+            task = asyncio.create_task(self._retry_later(job.job_id, 2 ** job.attempts))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+
+    async def _retry_later(self, job_id: str, delay: float):
+        await asyncio.sleep(delay)
+        await self._queue.put(job_id)
+
+
+optimization_jobs = OptimizationJobQueue(
+    workers=Config.OPTIMIZE_JOB_WORKERS,
+    queue_size=Config.OPTIMIZE_JOB_QUEUE_SIZE,
+    max_attempts=Config.OPTIMIZE_JOB_MAX_ATTEMPTS,
+    lease_seconds=Config.OPTIMIZE_JOB_LEASE_SECONDS,
+)
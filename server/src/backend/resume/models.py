@@ -1,12 +1,13 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, ARRAY
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, ARRAY, DateTime, Index, text
 from sqlalchemy.orm import relationship
 from ..config.db import Base
 from ..base.models import TimeStampedModel
+from .constants import JOB_PENDING
 
 class Resume(TimeStampedModel):
     __tablename__ = 'resumes'
 
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     name = Column(String, nullable=False)
     email = Column(String, nullable=False)
     phone = Column(String, nullable=True)
@@ -22,12 +23,18 @@ class Resume(TimeStampedModel):
     experiences = relationship("Experience", back_populates="resume", cascade="all, delete-orphan")
     educations = relationship("Education", back_populates="resume", cascade="all, delete-orphan")
     certifications = relationship("Certification", back_populates="resume", cascade="all, delete-orphan")
+    optimization_jobs = relationship("ResumeOptimizationJob", back_populates="resume", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Serves the /summary keyset, which orders a user's resumes by last modification
+        Index("ix_resumes_user_id_last_modified", "user_id", text("coalesce(updated_at, created_at) DESC"), text("id DESC")),
+    )
     
 
 class Experience(TimeStampedModel):
     __tablename__ = 'experiences'
 
-    resume_id = Column(Integer, ForeignKey('resumes.id'), nullable=False)
+    resume_id = Column(Integer, ForeignKey('resumes.id'), nullable=False, index=True)
     job_title = Column(String, nullable=False)
     organization = Column(String, nullable=False)
     start_date = Column(String, nullable=False)
@@ -40,7 +47,7 @@ class Experience(TimeStampedModel):
 class Education(TimeStampedModel):
     __tablename__ = 'educations'
 
-    resume_id = Column(Integer, ForeignKey('resumes.id'), nullable=False)
+    resume_id = Column(Integer, ForeignKey('resumes.id'), nullable=False, index=True)
     degree = Column(String, nullable=False)
     institution = Column(String, nullable=False)
     start_date = Column(String, nullable=False)
@@ -53,9 +60,26 @@ class Education(TimeStampedModel):
 class Certification(TimeStampedModel):
     __tablename__ = 'certifications'
 
-    resume_id = Column(Integer, ForeignKey('resumes.id'), nullable=False)
+    resume_id = Column(Integer, ForeignKey('resumes.id'), nullable=False, index=True)
     certification_name = Column(String, nullable=False)
     issuing_organization = Column(String, nullable=False)
     issue_date = Column(String, nullable=True)
 
-    resume = relationship("Resume", back_populates="certifications")
\ No newline at end of file
+    resume = relationship("Resume", back_populates="certifications")
+
+
+class ResumeOptimizationJob(TimeStampedModel):
+    __tablename__ = 'resume_optimization_jobs'
+
+    job_id = Column(String, nullable=False, unique=True, index=True)
+    resume_id = Column(Integer, ForeignKey('resumes.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    job_description = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=JOB_PENDING)
+    attempts = Column(Integer, default=0)
+    # Lease of the worker running the job, an expired RUNNING lease means that worker died
+    locked_until = Column(DateTime, nullable=True)
+    result = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+
+    resume = relationship("Resume", back_populates="optimization_jobs")
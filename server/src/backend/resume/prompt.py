@@ -5,4 +5,19 @@ def prompt() -> str:
 
 You are my personal recruitment consultant and CV expert. Your task is to take a good look at "My CV" section and the "Job Description" section below and rework my CV to perfectly align it with the "Job Description", ensuring you capture all the relevant keywords, skills, and all the important elements in the job description. The “Professional Summary” section should highlight all my professional experiences, skills and education in such a way that it aligns with the expectations of the “job description” in no more than 5 sentences.The “Key Skills/Areas of Expertise” section should showcase the key skills required in the “job Description” section below. The “Career Highlights” section should showcase the most impactful accomplishments of my career as per their relevance to the “Job Description” section.In the “work experience’ section, each work experience should contain the “Role Summary” and “Accomplishments”. Before listing the bullet points showing the accomplishments for each work experience, you need to provide in no more than 40 words a “Role Summary” that briefly describes the role and the objectives of the role, for example “Hired to lead a team of 6 in defining and executing SaaS product strategy, in the organization. Reporting to the VP marketing and responsible for driving business revenue growth.”  The “accomplishments” segment under the “Work experience” section should contain a minimum of 5 highly impactful achievements (in line with the “job description”) keeping it in line with the context of my work experience as seen in “my CV” section. 80% of the accomplishments should contain key metrics that demonstrate my achievements in each of my work experiences. The “accomplishment” bullet points should demonstrate my domain-specific knowledge, relevant work experiences and aligned with the job description. You are to highlight all the key skills, tools, frameworks, etc, as expressed in the “job description” and showcase in the bullet points how these have been applied in my work experiences. In the end, show me the percentage alignment of the newly generated CV vis-a-vis the “Job Description” I need the output to be 100% aligned with “the Job Description” and to be 100% ATS compliant, while retaining the general contexts of my work experience as seen in “my CV”. Section. The output should be in markdown format without requiring further formatting. 
 
-"""
\ No newline at end of file
+"""
+
+
+def generate_cv_prompt(cv_text: str, jd_text: str) -> str:
+    prompt = f"""You are my personal recruitment consultant and CV expert. Your task is to analyze the "My CV" section and the "Job Description" section provided below, then rework my CV to perfectly align with the Job Description. Ensure you capture all the relevant keywords, skills, and important elements from the Job Description.
+        For the Professional Summary section, highlight my professional experiences, skills, and education so that it aligns with the Job Description in no more than 5 sentences.
+        For the Key Skills/Areas of Expertise section, list the key skills required in the Job Description.
+        For the Career Highlights section, showcase the most impactful accomplishments of my career as they relate to the Job Description.
+        In the Work Experience section, each work experience entry must contain a Role Summary and Accomplishments. The Role Summary should be no more than 40 words and briefly describe the role and its objectives (for example, "Hired to lead a team of 6 in defining and executing SaaS product strategy, reporting to the VP of Marketing and responsible for driving business revenue growth"). The Accomplishments for each work experience must include a minimum of 5 highly impactful achievements that align with the Job Description, with at least 80% of these accomplishments including key metrics to demonstrate success. Each accomplishment should showcase my domain-specific knowledge and relevant work experience by highlighting the key skills, tools, and frameworks expressed in the Job Description and demonstrating how they have been applied in my work.
+        At the end, provide a percentage alignment of the newly generated CV with the Job Description, ensuring the output is 100% aligned with the Job Description and 100% ATS compliant, while retaining the context of my work experience as shown in the "My CV" section.
+        Output the final CV in markdown format without any additional formatting, and do not use any '#' or '*' symbols.
+        "My CV" Section:
+        {cv_text}
+        "Job Description" Section:
+        {jd_text}"""
+    return prompt
@@ -1,23 +1,25 @@
 import os
-import shopify
 from typing import List
-from datetime import timedelta
+from datetime import datetime, timedelta
 from fastapi import APIRouter, status, Depends, Request
-from fastapi.responses import JSONResponse, RedirectResponse
-from sqlalchemy.orm import Session, joinedload
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.exceptions import HTTPException
 
 from pydantic import BaseModel
 
-from ..config.db import get_db
+from ..config.db import get_async_db
 from ..base.auth import  create_access_token, create_refresh_token, verify_token
 from ..base import response
-from .models import Resume, Experience, Education, Certification
-from .serializer import ResumeCreateSerilizer, ResumeUpdateSerializer, OptimizeResumeSerializer
-from ..accounts.services import get_current_user
-from ..accounts.models import User
-
-import openai
+from ..base.pagination_filter import KeysetPaginationOptions, keyset_paginate, keyset_page
+from .models import Resume, Experience, Education, Certification, ResumeOptimizationJob
+from .serializer import ResumeCreateSerilizer, ResumeBulkCreateSerializer, ResumeUpdateSerializer, ResumePatchSerializer, OptimizeResumeSerializer
+from ..accounts.services import get_token_user
+from ..base.auth import AuthenticatedUser
+from .jobs import optimization_jobs
+from .services import bulk_create_resumes, patch_resume, get_resume_prompt_data, generate_optimized_resume, stream_optimized_resume_events
 
 
 
@@ -26,90 +28,87 @@ resume_router = APIRouter()
 @resume_router.post("/")
 async def create_resume(
     request_data: ResumeCreateSerilizer,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_token_user),
 ):
-    # Create a new resume
-    resume = Resume(
-        user_id=user.id,
-        name=request_data.name,
-        email=request_data.email,
-        phone=request_data.phone,
-        location=request_data.location,
-        linkedin=request_data.linkedin,
-        professional_title=request_data.professional_title,
-        summary=request_data.summary,
-        skills=request_data.skills,
-        career_highlights=request_data.career_highlights
-    )
-    db.add(resume)
-    db.flush()
-
-    if request_data.experiences:
-        for exp in request_data.experiences:
-            experience = Experience(
-                resume_id=resume.id,
-                job_title=exp.job_title,
-                organization=exp.organization,
-                start_date=exp.start_date,
-                end_date=exp.end_date,
-                is_current=exp.is_current,
-                description=exp.description
-            )
-            db.add(experience)
-
-    if request_data.educations:
-        for edu in request_data.educations:
-            education = Education(
-                resume_id=resume.id,
-                degree=edu.degree,
-                institution=edu.institution,
-                start_date=edu.start_date,
-                end_date=edu.end_date,
-                is_current=edu.is_current,
-                grade=edu.grade
-            )
-            db.add(education)
-    if request_data.certifications:
-        for cert in request_data.certifications:
-            certification = Certification(
-                resume_id=resume.id,
-                certification_name=cert.certification_name,
-                issuing_organization=cert.issuing_organization,
-                issue_date=cert.issue_date
-            )
-            db.add(certification)
-    db.commit()
-    db.refresh(resume)
+    await bulk_create_resumes(db, user.id, [request_data])
+    await db.commit()
     return response.Ok("Resume created successfully")
 
 
+@resume_router.post("/bulk")
+async def bulk_create_resume(
+    request_data: ResumeBulkCreateSerializer,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_token_user),
+):
+    """Import many resumes in a single transaction."""
+    resume_ids = await bulk_create_resumes(db, user.id, request_data.resumes)
+    await db.commit()
+    return response.Ok("Resumes created successfully", {"ids": resume_ids, "count": len(resume_ids)})
+
+
 @resume_router.get("/")
 async def get_resumes(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_token_user),
 ):
 
-    # Get all resumes for the user
-    # resumes = db.query(Resume).filter(Resume.user_id == user.id).join(Experience).join(Education).join(Certification).all()
-    resumes = db.query(Resume).filter(Resume.user_id == user.id)\
+    # Get all resumes for the user; selectinload avoids the exp x edu x cert row explosion of joins
+    resumes = (await db.scalars(
+        select(Resume).where(Resume.user_id == user.id)
         .options(
-            joinedload(Resume.experiences),
-            joinedload(Resume.educations),
-            joinedload(Resume.certifications)
-        ).all()
+            selectinload(Resume.experiences),
+            selectinload(Resume.educations),
+            selectinload(Resume.certifications)
+        )
+    )).all()
     
     return resumes
 
 
+@resume_router.get("/summary")
+async def get_resume_summaries(
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_token_user),
+    options: KeysetPaginationOptions = Depends(),
+):
+    """Dashboard listing: a few columns per resume, most recently updated first, keyset paginated."""
+    # updated_at is NULL until the first update, a NULL key would break the tuple comparison
+    last_modified = func.coalesce(Resume.updated_at, Resume.created_at)
+    stmt = select(Resume.id, Resume.name, Resume.professional_title, last_modified.label("updated_at")).where(Resume.user_id == user.id)
+    stmt = keyset_paginate(stmt, (last_modified, Resume.id), (datetime.fromisoformat, int), options)
+    rows = (await db.execute(stmt)).all()
+    return response.Ok("Resumes found", keyset_page(rows, ("updated_at", "id"), options))
+
+
+@resume_router.get("/{resume_id}")
+async def get_resume(
+    resume_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_token_user),
+):
+    resume = await db.scalar(
+        select(Resume).where(Resume.id == resume_id, Resume.user_id == user.id)
+        .options(
+            selectinload(Resume.experiences),
+            selectinload(Resume.educations),
+            selectinload(Resume.certifications)
+        )
+    )
+    if not resume:
+        raise response.NotFound("Resume does not exist")
+    return resume
+
+
 @resume_router.put("/")
 async def update_resume(
     request_data: ResumeUpdateSerializer,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_token_user)
 ):
     # Check if the resume exists
-    resume = db.query(Resume).filter(Resume.id == request_data.id, Resume.user_id == user.id).first()
+    resume = await db.scalar(select(Resume).where(Resume.id == request_data.id, Resume.user_id == user.id))
     if not resume:
         raise response.BadRequest("Resume does not exist")
     
@@ -124,88 +123,86 @@ async def update_resume(
     resume.skills = request_data.skills
     resume.career_highlights = request_data.career_highlights
 
-    db.commit()
-    db.refresh(resume)
+    await db.commit()
     return response.Ok("Resume updated successfully")
 
 
-from .prompt import prompt
-
+@resume_router.patch("/{resume_id}")
+async def partial_update_resume(
+    resume_id: int,
+    request_data: ResumePatchSerializer,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_token_user)
+):
+    """Autosave endpoint: applies only the fields sent and the child rows that changed."""
+    updated_at = await patch_resume(db, resume_id, user.id, request_data)
+    await db.commit()
+    return response.Ok("Resume updated successfully", {"id": resume_id, "updated_at": updated_at.isoformat()})
 
-def generate_cv_prompt(cv_text: str, jd_text: str) -> str:
-    prompt = f"""You are my personal recruitment consultant and CV expert. Your task is to analyze the "My CV" section and the "Job Description" section provided below, then rework my CV to perfectly align with the Job Description. Ensure you capture all the relevant keywords, skills, and important elements from the Job Description.
-        For the Professional Summary section, highlight my professional experiences, skills, and education so that it aligns with the Job Description in no more than 5 sentences.
-        For the Key Skills/Areas of Expertise section, list the key skills required in the Job Description.
-        For the Career Highlights section, showcase the most impactful accomplishments of my career as they relate to the Job Description.
-        In the Work Experience section, each work experience entry must contain a Role Summary and Accomplishments. The Role Summary should be no more than 40 words and briefly describe the role and its objectives (for example, "Hired to lead a team of 6 in defining and executing SaaS product strategy, reporting to the VP of Marketing and responsible for driving business revenue growth"). The Accomplishments for each work experience must include a minimum of 5 highly impactful achievements that align with the Job Description, with at least 80% of these accomplishments including key metrics to demonstrate success. Each accomplishment should showcase my domain-specific knowledge and relevant work experience by highlighting the key skills, tools, and frameworks expressed in the Job Description and demonstrating how they have been applied in my work.
-        At the end, provide a percentage alignment of the newly generated CV with the Job Description, ensuring the output is 100% aligned with the Job Description and 100% ATS compliant, while retaining the context of my work experience as shown in the "My CV" section.
-        Output the final CV in markdown format without any additional formatting, and do not use any '#' or '*' symbols.
-        "My CV" Section:
-        {cv_text}
-        "Job Description" Section:
-        {jd_text}"""
-    return prompt
 
+from .prompt import generate_cv_prompt
 
 
 @resume_router.post("/optimize_resume")
 async def optimize_resume(
     request_data: OptimizeResumeSerializer,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_token_user)
 ):
-    
-    resume = db.query(Resume).filter(Resume.id == request_data.resume_id)\
-        .options(
-            joinedload(Resume.experiences),
-            joinedload(Resume.educations),
-            joinedload(Resume.certifications)
-        ).first()
-    
-    
-    if not resume:
-        raise response.BadRequest("Resume does not exist")
-    resume = {
-        "name": resume.name,
-        "email": resume.email,
-        "phone": resume.phone,
-        "location": resume.location,
-        "linkedin": resume.linkedin,
-        "professional_title": resume.professional_title,
-        "summary": resume.summary,
-        "skills": resume.skills,
-        "career_highlights": resume.career_highlights
-    }    
-
-    prompt_text = prompt()
-    resume_and_jd = f"""
-    Resume: {resume}
-    Job Description: {request_data.job_description}
-    """
-
-
-    print("OpenAI Response:")
-    hi= generate_cv_prompt(resume, request_data.job_description)
-    print("OpenAI Response Choices:")
-
-
-    openai_response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "user", "content": hi}
-        ],
-        temperature=0.7,
-        max_tokens=1500,
-        top_p=1,
-        frequency_penalty=0,
-    ) 
+    resume = await get_resume_prompt_data(db, request_data.resume_id, user.id)
+    # Hand the connection back to the pool before the model call, which takes tens of seconds
+    await db.close()
+    optimized_resume = await generate_optimized_resume(resume, request_data.job_description)
+    return response.Ok("Resume optimized successfully", {"optimized_resume": optimized_resume})
 
-    print("OpenAI Response Choices:")
-    print(openai_response)
-    print("OpenAI Response Choices:")
 
+@resume_router.post("/optimize_resume/stream")
+async def optimize_resume_stream(
+    request_data: OptimizeResumeSerializer,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_token_user)
+):
+    """Same as /optimize_resume but forwards tokens as server-sent events while they are generated."""
+    resume = await get_resume_prompt_data(db, request_data.resume_id, user.id)
+    # The stream outlives the handler, release the connection before it starts
+    await db.close()
+    return StreamingResponse(
+        stream_optimized_resume_events(resume, request_data.job_description),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    return response.Ok("Resume optimized successfully")
 
+@resume_router.post("/optimize_resume/jobs")
+async def submit_optimize_resume_job(
+    request_data: OptimizeResumeSerializer,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_token_user)
+):
+    """Queue an optimization and return its job id straight away; poll GET /optimize_resume/{job_id}."""
+    resume_id = await db.scalar(select(Resume.id).where(Resume.id == request_data.resume_id, Resume.user_id == user.id))
+    if not resume_id:
+        raise response.BadRequest("Resume does not exist")
+    job = await optimization_jobs.submit(db, resume_id, user.id, request_data.job_description)
+    return response.Ok("Resume optimization queued", {"job_id": job.job_id, "status": job.status})
 
 
+@resume_router.get("/optimize_resume/{job_id}")
+async def get_optimize_resume_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_token_user)
+):
+    job = await db.scalar(
+        select(ResumeOptimizationJob).where(ResumeOptimizationJob.job_id == job_id, ResumeOptimizationJob.user_id == user.id)
+    )
+    if not job:
+        raise response.NotFound("Optimization job does not exist")
+    return response.Ok("Optimization job found", {
+        "job_id": job.job_id,
+        "resume_id": job.resume_id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "result": job.result,
+        "error": job.error,
+    })
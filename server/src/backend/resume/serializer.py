@@ -1,9 +1,18 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
+from datetime import datetime
 from fastapi import HTTPException
-from pydantic import root_validator
+from pydantic import root_validator, field_validator, ValidationError
 from ..base.validators import is_valid_email
 from ..base import response
+from .constants import RESUME_BULK_MAX_ITEMS
+
+def reject_nulls(values: dict, fields: tuple, required: bool):
+    """400 for a non-nullable column sent as null, or left out of a row that is being created."""
+    for field in fields:
+        if values.get(field) is None and (required or field in values):
+            raise response.BadRequest(f"{field} cannot be null")
+
 
 class ExperienceSerializer(BaseModel):
     job_title: Optional[str] = None
@@ -13,6 +22,11 @@ class ExperienceSerializer(BaseModel):
     is_current: Optional[bool] = False
     description: Optional[List[str]] = None
 
+    @root_validator(pre=True)
+    def validate_required(cls, values):
+        reject_nulls(values, ("job_title", "organization", "start_date"), required=True)
+        return values
+
 class EducationSerializer(BaseModel):
     degree: Optional[str] = None
     institution: Optional[str] = None
@@ -21,12 +35,20 @@ class EducationSerializer(BaseModel):
     is_current: Optional[bool] = False
     grade: Optional[str] = None
 
+    @root_validator(pre=True)
+    def validate_required(cls, values):
+        reject_nulls(values, ("degree", "institution", "start_date"), required=True)
+        return values
+
 class CertificationSerializer(BaseModel):
     certification_name: Optional[str] = None
     issuing_organization: Optional[str] = None
     issue_date: Optional[str] = None
 
-    
+    @root_validator(pre=True)
+    def validate_required(cls, values):
+        reject_nulls(values, ("certification_name", "issuing_organization"), required=True)
+        return values
 
 
 class ResumeCreateSerilizer(BaseModel):
@@ -104,9 +126,108 @@ class ResumeCreateSerilizer(BaseModel):
         }
     }
 
+class ResumeBulkCreateSerializer(BaseModel):
+    resumes: List[ResumeCreateSerilizer] = Field(..., min_length=1, max_length=RESUME_BULK_MAX_ITEMS)
+
+    @field_validator("resumes", mode="before")
+    @classmethod
+    def validate_items(cls, items):
+        # Validated one by one so that a 400 names the failing item
+        if not isinstance(items, list):
+            return items
+        validated = []
+        for index, item in enumerate(items):
+            try:
+                validated.append(ResumeCreateSerilizer.model_validate(item))
+            except ValidationError:
+                # Left to pydantic, whose 422 already carries the index
+                validated.append(item)
+            except HTTPException as e:
+                raise response.BadRequest(f"resumes[{index}]: {e.detail['message']}")
+        return validated
+
+
 class ResumeUpdateSerializer(ResumeCreateSerilizer):
     id: int
 
+class ExperiencePatchSerializer(ExperienceSerializer):
+    id: Optional[int] = None
+
+    @root_validator(pre=True)
+    def validate_required(cls, values):
+        reject_nulls(values, ("job_title", "organization", "start_date"), required=values.get("id") is None)
+        return values
+
+class EducationPatchSerializer(EducationSerializer):
+    id: Optional[int] = None
+
+    @root_validator(pre=True)
+    def validate_required(cls, values):
+        reject_nulls(values, ("degree", "institution", "start_date"), required=values.get("id") is None)
+        return values
+
+class CertificationPatchSerializer(CertificationSerializer):
+    id: Optional[int] = None
+
+    @root_validator(pre=True)
+    def validate_required(cls, values):
+        reject_nulls(values, ("certification_name", "issuing_organization"), required=values.get("id") is None)
+        return values
+
+
+class ResumePatchSerializer(BaseModel):
+    """Merge-patch body: only the fields present are applied.
+
+    Child items carrying an `id` are updated, items without one are created and
+    stored children missing from a provided list are deleted. `updated_at` must be
+    the value last read by the client (`created_at` for a resume never updated);
+    timezone aware values are converted to server local time, which is how
+    TimeStampedModel stores timestamps.
+    """
+    updated_at: datetime
+    name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    location: Optional[str] = None
+    linkedin: Optional[str] = None
+    professional_title: Optional[str] = None
+    summary: Optional[str] = None
+    skills: Optional[List[str]] = None
+    career_highlights: Optional[List[str]] = None
+    experiences: Optional[List[ExperiencePatchSerializer]] = None
+    educations: Optional[List[EducationPatchSerializer]] = None
+    certifications: Optional[List[CertificationPatchSerializer]] = None
+
+    @root_validator(pre=True)
+    def validate_email(cls, values):
+        reject_nulls(values, ("name",), required=False)
+        if "email" in values and not is_valid_email(values.get("email") or ""):
+            raise response.BadRequest("Invalid email Format")
+        return values
+
+    @field_validator("updated_at")
+    @classmethod
+    def naive_local(cls, value: datetime) -> datetime:
+        # Timestamps are stored naive in server local time (datetime.now), an aware
+        # echo such as "...Z" must still match the stored value on a non UTC host
+        if value.tzinfo is not None:
+            value = value.astimezone().replace(tzinfo=None)
+        return value
+
+    model_config = {
+        "json_schema_extra":{
+            "example": {
+                "updated_at": "2025-03-01T10:00:00.000000",
+                "summary": "Experienced software engineer with a passion for problem-solving",
+                "experiences": [
+                    {"id": 1, "job_title": "Lead Developer"},
+                    {"job_title": "Intern", "organization": "Code Masters", "start_date": "2016-06-01"}
+                ]
+            }
+        }
+    }
+
+
 class OptimizeResumeSerializer(BaseModel):
     resume_id: int
     job_description: str
@@ -1,12 +1,336 @@
 import json
-import random
-import shopify
-import requests
-from passlib.context import CryptContext
-from fastapi.security import APIKeyHeader
-from fastapi import HTTPException, Request, Security, status, Depends
-
-from ..base.auth import verify_token
+import hashlib
+from datetime import datetime
+from typing import TYPE_CHECKING
+from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from ..config.config import Config
 from ..base import response
+from ..base.cache import build_cache_backend
+from ..config.metrics import track_outbound
+from .prompt import generate_cv_prompt
+from .models import Resume, Experience, Education, Certification
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# The openai package is imported and the client created on first use and shared so the underlying HTTP connections are reused
+_openai_client: "AsyncOpenAI | None" = None
+
+
+def get_openai_client() -> "AsyncOpenAI":
+    """Return the process wide async OpenAI client (OPENAI_BASE_URL can point at a local stub)."""
+    global _openai_client
+    if _openai_client is None:
+        from openai import AsyncOpenAI
+        _openai_client = AsyncOpenAI(
+            api_key=Config.OPENAI_API_KEY,
+            base_url=Config.OPENAI_BASE_URL or None,
+            timeout=Config.OPENAI_TIMEOUT_SECONDS,
+        )
+    return _openai_client
+
+
+# Optimized resumes keyed by optimization_cache_key()
+optimization_cache = build_cache_backend(
+    Config.OPTIMIZE_CACHE_BACKEND,
+    namespace="resume-optimization",
+    maxsize=Config.OPTIMIZE_CACHE_MAX_ENTRIES,
+    ttl=Config.OPTIMIZE_CACHE_TTL_SECONDS,
+    redis_url=Config.REDIS_URL,
+)
+
+
+async def get_resume_prompt_data(db: AsyncSession, resume_id: int, user_id: int) -> dict:
+    """Load one of the user's resumes and return the fields sent to the model."""
+    # Only resume columns go into the prompt, so the children are not loaded
+    resume = await db.scalar(select(Resume).where(Resume.id == resume_id, Resume.user_id == user_id))
+    if not resume:
+        raise response.BadRequest("Resume does not exist")
+    return {
+        "name": resume.name,
+        "email": resume.email,
+        "phone": resume.phone,
+        "location": resume.location,
+        "linkedin": resume.linkedin,
+        "professional_title": resume.professional_title,
+        "summary": resume.summary,
+        "skills": resume.skills,
+        "career_highlights": resume.career_highlights
+    }
+
+
+def _resume_row(user_id: int, data) -> dict:
+    return {
+        "user_id": user_id,
+        "name": data.name,
+        "email": data.email,
+        "phone": data.phone,
+        "location": data.location,
+        "linkedin": data.linkedin,
+        "professional_title": data.professional_title,
+        "summary": data.summary,
+        "skills": data.skills,
+        "career_highlights": data.career_highlights,
+    }
+
+
+def _experience_row(resume_id: int, exp) -> dict:
+    return {
+        "resume_id": resume_id,
+        "job_title": exp.job_title,
+        "organization": exp.organization,
+        "start_date": exp.start_date,
+        "end_date": exp.end_date,
+        "is_current": exp.is_current,
+        "description": exp.description,
+    }
+
+
+def _education_row(resume_id: int, edu) -> dict:
+    return {
+        "resume_id": resume_id,
+        "degree": edu.degree,
+        "institution": edu.institution,
+        "start_date": edu.start_date,
+        "end_date": edu.end_date,
+        "is_current": edu.is_current,
+        "grade": edu.grade,
+    }
+
+
+def _certification_row(resume_id: int, cert) -> dict:
+    return {
+        "resume_id": resume_id,
+        "certification_name": cert.certification_name,
+        "issuing_organization": cert.issuing_organization,
+        "issue_date": cert.issue_date,
+    }
+
+
+async def bulk_create_resumes(db: AsyncSession, user_id: int, resumes: list) -> list[int]:
+    """Insert resumes with their experiences, educations and certifications.
+
+    Issues one INSERT ... RETURNING id for all the resumes and one multi-row INSERT
+    per child table, whatever the number of resumes. The caller commits.
+    """
+    if not resumes:
+        return []
+    resume_ids = (await db.execute(
+        insert(Resume).returning(Resume.id, sort_by_parameter_order=True),
+        [_resume_row(user_id, data) for data in resumes],
+    )).scalars().all()
+
+    experiences, educations, certifications = [], [], []
+    for resume_id, data in zip(resume_ids, resumes):
+        experiences.extend(_experience_row(resume_id, exp) for exp in data.experiences or [])
+        educations.extend(_education_row(resume_id, edu) for edu in data.educations or [])
+        certifications.extend(_certification_row(resume_id, cert) for cert in data.certifications or [])
+
+    if experiences:
+        await db.execute(insert(Experience), experiences)
+    if educations:
+        await db.execute(insert(Education), educations)
+    if certifications:
+        await db.execute(insert(Certification), certifications)
+    return list(resume_ids)
+
+
+# Scalar columns of Resume a PATCH may change
+RESUME_PATCH_FIELDS = (
+    "name", "email", "phone", "location", "linkedin", "professional_title",
+    "summary", "skills", "career_highlights",
+)
+
+
+def _diff_children(model, stored: list, items: list | None, build_row) -> tuple[list, list, list]:
+    """Return (rows to insert, per-row changes to update, ids to delete) for one child collection."""
+    stored_by_id = {child.id: child for child in stored}
+    inserts, updates, kept_ids = [], [], set()
+    for item in items or []:
+        if item.id is None:
+            inserts.append(item)
+            continue
+        child = stored_by_id.get(item.id)
+        if child is None:
+            raise response.BadRequest(f"{model.__name__} {item.id} does not belong to this resume")
+        kept_ids.add(item.id)
+        changes = {
+            field: getattr(item, field)
+            for field in item.model_fields_set - {"id"}
+            if getattr(child, field) != getattr(item, field)
+        }
+        if changes:
+            updates.append({"id": item.id, **changes})
+    deletes = [child_id for child_id in stored_by_id if child_id not in kept_ids]
+    return [build_row(item) for item in inserts], updates, deletes
+
+
+async def patch_resume(db: AsyncSession, resume_id: int, user_id: int, patch) -> datetime:
+    """Apply a merge-patch to a resume and its children, writing only what changed.
+
+    The resume row is updated conditionally on the `updated_at` the client read, so
+    a concurrent edit makes the patch fail with 409 instead of being overwritten.
+    Returns the resume's new `updated_at`. The caller commits.
+    """
+    resume = await db.scalar(
+        select(Resume).where(Resume.id == resume_id, Resume.user_id == user_id)
+        .options(
+            selectinload(Resume.experiences),
+            selectinload(Resume.educations),
+            selectinload(Resume.certifications)
+        )
+    )
+    if not resume:
+        raise response.BadRequest("Resume does not exist")
+    # Rows never updated have no updated_at, clients then send created_at
+    version = func.coalesce(Resume.updated_at, Resume.created_at)
+    if (resume.updated_at or resume.created_at) != patch.updated_at:
+        raise response.Conflict("Resume was modified by another request, reload it and try again")
+
+    fields_set = patch.model_fields_set
+    scalar_changes = {
+        field: getattr(patch, field)
+        for field in RESUME_PATCH_FIELDS
+        if field in fields_set and getattr(resume, field) != getattr(patch, field)
+    }
+
+    collections = (
+        ("experiences", Experience, _experience_row),
+        ("educations", Education, _education_row),
+        ("certifications", Certification, _certification_row),
+    )
+    child_changes = []
+    for name, model, row_builder in collections:
+        if name in fields_set:
+            changes = _diff_children(model, getattr(resume, name), getattr(patch, name),
+                                     lambda item, row_builder=row_builder: row_builder(resume_id, item))
+            if any(changes):
+                child_changes.append((model, *changes))
+
+    if not scalar_changes and not child_changes:
+        return resume.updated_at or resume.created_at
+
+    updated_at = datetime.now()
+    result = await db.execute(
+        update(Resume)
+        .where(Resume.id == resume_id, version == patch.updated_at)
+        .values(**scalar_changes, updated_at=updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise response.Conflict("Resume was modified by another request, reload it and try again")
+
+    for model, inserts, updates, deletes in child_changes:
+        if deletes:
+            await db.execute(delete(model).where(model.id.in_(deletes)).execution_options(synchronize_session=False))
+        if updates:
+            await db.execute(update(model), updates)
+        if inserts:
+            await db.execute(insert(model), inserts)
+    return updated_at
+
+
+def get_completion_parameters() -> dict:
+    """Model parameters used for resume optimization."""
+    return {
+        "model": Config.OPENAI_MODEL,
+        "temperature": 0.7,
+        "max_tokens": 1500,
+        "top_p": 1,
+        "frequency_penalty": 0,
+    }
+
+
+def build_optimization_messages(resume: dict, job_description: str) -> list[dict]:
+    return [{"role": "user", "content": generate_cv_prompt(resume, job_description)}]
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    return value
+
+
+def optimization_cache_key(resume: dict, job_description: str) -> str:
+    """Hash of everything that determines the model output.
+
+    Whitespace differences in the resume or job description do not change the key,
+    while editing the prompt template or the model parameters does.
+    """
+    payload = {
+        "resume": _normalize(resume),
+        "job_description": _normalize(job_description),
+        "prompt_template": generate_cv_prompt("{cv_text}", "{jd_text}"),
+        "parameters": get_completion_parameters(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def generate_optimized_resume(resume: dict, job_description: str) -> str:
+    """Ask the model for an optimized resume and return the whole text."""
+    cache_key = optimization_cache_key(resume, job_description)
+    cached = await optimization_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    client = get_openai_client()
+    with track_outbound("openai"):
+        completion = await client.chat.completions.create(
+            messages=build_optimization_messages(resume, job_description),
+            **get_completion_parameters(),
+        )
+    content = completion.choices[0].message.content or ""
+    if content:
+        await optimization_cache.set(cache_key, content)
+    return content
+
+
+async def stream_optimized_resume(resume: dict, job_description: str):
+    """Yield the optimized resume text piece by piece as the model generates it.
+
+    A cached result is yielded as a single piece; a fully streamed result is cached.
+    """
+    cache_key = optimization_cache_key(resume, job_description)
+    cached = await optimization_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    client = get_openai_client()
+    parts = []
+    with track_outbound("openai"):
+        stream = await client.chat.completions.create(
+            messages=build_optimization_messages(resume, job_description),
+            stream=True,
+            **get_completion_parameters(),
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+    if parts:
+        await optimization_cache.set(cache_key, "".join(parts))
+
+
+def format_sse(data: dict, event: str | None = None) -> str:
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
 
+async def stream_optimized_resume_events(resume: dict, job_description: str):
+    """Server-sent events wrapper around stream_optimized_resume."""
+    try:
+        async for content in stream_optimized_resume(resume, job_description):
+            yield format_sse({"content": content})
+    except Exception as e:
+        print(f"❌ Failed to optimize resume: {e}")
+        yield format_sse({"message": "Failed to optimize resume"}, event="error")
+        return
+    yield format_sse({"success": True}, event="done")
@@ -0,0 +1,88 @@
+import json
+import time
+import asyncio
+import hashlib
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config.config import Config
+from ..config.db import AsyncSessionLocal
+from ..base.cache_sync import cache_listener
+from .models import SubscriptionPlan
+
+# Postgres NOTIFY channel telling every worker that the plans changed
+PLAN_CATALOG_CHANNEL = "plan_catalog_invalidate"
+
+
+def make_etag(body: bytes) -> str:
+    return '"{}"'.format(hashlib.sha256(body).hexdigest()[:32])
+
+
+class PlanCatalogCache:
+    """Read-through cache of the serialized active subscription plans.
+
+    Writers call publish_invalidation() before committing and invalidate() after.
+    invalidate() bumps the version so the next read reloads; every other worker
+    does the same once the notification arrives. The TTL only covers changes made
+    outside the app. Rendered bodies and their ETags are kept per plan id until
+    the next reload.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self._plans = None
+        self._rendered = {}
+        self._loaded_version = -1
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.version += 1
+
+    @staticmethod
+    async def publish_invalidation(db: AsyncSession):
+        """Ask every worker to reload, delivered by Postgres once `db` commits."""
+        await db.execute(select(func.pg_notify(PLAN_CATALOG_CHANNEL, "")))
+
+    def _is_fresh(self) -> bool:
+        return self._plans is not None and self._loaded_version == self.version and self._expires_at > time.monotonic()
+
+    async def get_plans(self) -> list[dict]:
+        if self._is_fresh():
+            return self._plans
+        async with self._lock:
+            # Another request may have reloaded while we waited for the lock
+            if self._is_fresh():
+                return self._plans
+            version = self.version
+            async with AsyncSessionLocal() as db:
+                plans = (await db.scalars(
+                    select(SubscriptionPlan).where(SubscriptionPlan.is_active == True).order_by(SubscriptionPlan.id)
+                )).all()
+            self._plans = jsonable_encoder(plans)
+            self._rendered = {}
+            self._loaded_version = version
+            self._expires_at = time.monotonic() + self.ttl
+            return self._plans
+
+    async def render(self, plan_id: int | None = None) -> tuple[bytes, str]:
+        """Return the JSON body and its ETag, optionally narrowed to one plan."""
+        plans = await self.get_plans()
+        if plan_id:
+            plans = [plan for plan in plans if plan["id"] == plan_id]
+            # Unknown ids all render the same empty list, keep one entry for them
+            key = plan_id if plans else "missing"
+        else:
+            key = None
+        rendered = self._rendered.get(key)
+        if rendered is None:
+            body = json.dumps(plans).encode()
+            # No await since get_plans(), so this is still the catalog the body was rendered from
+            rendered = self._rendered[key] = (body, make_etag(body))
+        return rendered
+
+
+plan_catalog = PlanCatalogCache(ttl=Config.PLAN_CATALOG_CACHE_TTL_SECONDS)
+cache_listener.register(PLAN_CATALOG_CHANNEL, lambda payload: plan_catalog.invalidate())
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+from sqlalchemy import Select, select
+
+from ..config.config import Config
+from ..accounts.models import User
+from ..base.campaigns import CampaignRunner
+from .models import Subscription, SubscriptionPlan
+
+
+def expiring_subscriptions(days_ahead: int) -> Select:
+    """Current subscriptions ending within `days_ahead` days, as campaign recipients.
+
+    Only the subscription User.current_subscription_id points at is selected, so
+    a user who already renewed is not reminded about the old one.
+    """
+    now = datetime.utcnow()
+    return (
+        select(
+            Subscription.id.label("source_id"),
+            User.email.label("to_email"),
+            User.name.label("name"),
+            SubscriptionPlan.name.label("plan_name"),
+            Subscription.end_date.label("end_date"),
+        )
+        .join(User, User.current_subscription_id == Subscription.id)
+        .join(SubscriptionPlan, SubscriptionPlan.id == Subscription.plan_id)
+        .where(Subscription.end_date > now, Subscription.end_date <= now + timedelta(days=days_ahead))
+    )
+
+
+async def run_expiry_reminder_campaign(days_ahead: int = Config.EXPIRY_REMINDER_DAYS) -> dict:
+    """Email every user whose subscription ends within `days_ahead` days, once per subscription."""
+    runner = CampaignRunner(
+        key=f"subscription-expiry-{days_ahead}d",
+        template_name="subscription_expiry.html",
+        subject="Your subscription is about to expire",
+        recipients=expiring_subscriptions(days_ahead),
+        source_column=Subscription.id,
+        shared_context={"days": days_ahead, "link": f"{Config.FRONTEND_URL}/pricing"},
+    )
+    return await runner.run()
@@ -1,2 +1,5 @@
 MONTHLY = "MONTHLY"
 YEARLY = "YEARLY"
+
+# Subscription states live in base so the cached principal can use them
+from ..base.constants import SUBSCRIPTION_ACTIVE, SUBSCRIPTION_EXPIRED  # noqa: F401
@@ -0,0 +1,76 @@
+# users.current_subscription_id is added and backfilled by migration 0004, run
+# `alembic upgrade head` on existing databases; create_all does not add columns.
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..accounts.models import User
+from .models import Subscription
+from .constants import SUBSCRIPTION_ACTIVE
+
+
+async def refresh_current_subscription(db: AsyncSession, user_id: int) -> Subscription | None:
+    """Point User.current_subscription_id at the user's latest subscription.
+
+    "Latest" is the highest start_date, served by ix_subscriptions_user_id_start_date.
+    current_plan_id follows the plan of that subscription while it is active.
+    Call inside the transaction that created or changed the subscription, then
+    invalidate the user's cached principal after the commit.
+    """
+    subscription = await db.scalar(
+        select(Subscription)
+        .where(Subscription.user_id == user_id)
+        .order_by(Subscription.start_date.desc(), Subscription.id.desc())
+        .limit(1)
+    )
+    active = subscription is not None and subscription.status == SUBSCRIPTION_ACTIVE
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            current_subscription_id=subscription.id if subscription else None,
+            current_plan_id=subscription.plan_id if active else None,
+        )
+    )
+    return subscription
+
+
+async def clear_current_plans(db: AsyncSession, subscription_ids: list[int]) -> list[str]:
+    """Reset current_plan_id of users whose current subscription is one of `subscription_ids`.
+
+    Called by the expiry sweeper for the subscriptions it just expired. Returns the
+    emails of the updated users so their cached principals can be dropped.
+    """
+    if not subscription_ids:
+        return []
+    result = await db.execute(
+        update(User)
+        .where(
+            User.current_subscription_id.in_(subscription_ids),
+            User.current_plan_id.is_not(None),
+        )
+        .values(current_plan_id=None)
+        .returning(User.email)
+    )
+    return list(result.scalars())
+
+
+async def restore_current_plans(db: AsyncSession, subscription_ids: list[int]) -> list[str]:
+    """Set current_plan_id back for users whose current subscription is one of `subscription_ids`.
+
+    Called by the expiry sweeper for subscriptions a trial extension made active
+    again. Returns the emails of the updated users.
+    """
+    if not subscription_ids:
+        return []
+    result = await db.execute(
+        update(User)
+        .where(
+            User.current_subscription_id == Subscription.id,
+            Subscription.id.in_(subscription_ids),
+            Subscription.status == SUBSCRIPTION_ACTIVE,
+            User.current_plan_id.is_distinct_from(Subscription.plan_id),
+        )
+        .values(current_plan_id=Subscription.plan_id)
+        .returning(User.email)
+    )
+    return list(result.scalars())
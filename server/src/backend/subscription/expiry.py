@@ -0,0 +1,161 @@
+import asyncio
+import calendar
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func, case, Integer
+
+from ..config.config import Config
+from ..config.db import AsyncSessionLocal, get_asyncpg_dsn
+from ..accounts.cache_sync import commit_user_changes
+from .models import Subscription, TrialPeriodExtension
+from .constants import MONTHLY, YEARLY, SUBSCRIPTION_ACTIVE, SUBSCRIPTION_EXPIRED
+from .current import clear_current_plans, restore_current_plans
+
+INTERVAL_MONTHS = {
+    MONTHLY: 1,
+    YEARLY: 12,
+}
+
+# pg_try_advisory_lock key held by the process running the sweep, any constant bigint shared by all workers
+SWEEPER_LOCK_KEY = 0x5355425357454550
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Calendar month arithmetic, clamped to the last day like Postgres `+ interval '1 month'`."""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def compute_end_date(start_date: datetime, interval: str, trial_period_days: int | None = None,
+                     extended_days: int = 0) -> datetime:
+    """End of a subscription: one billing interval plus the plan trial and any trial extensions."""
+    return add_months(start_date, INTERVAL_MONTHS[interval]) + timedelta(days=(trial_period_days or 0) + extended_days)
+
+
+def subscription_status(end_date: datetime | None, now: datetime | None = None) -> str:
+    if end_date is not None and end_date < (now or datetime.utcnow()):
+        return SUBSCRIPTION_EXPIRED
+    return SUBSCRIPTION_ACTIVE
+
+
+class ExpirySweeper:
+    """Periodically materializes Subscription.status so requests never compare dates.
+
+    Every process runs the loop but only the one holding the Postgres advisory lock
+    sweeps. The lock is taken for each sweep on a dedicated connection outside the
+    pool, so no pool slot is pinned, and it is released if that process dies. A
+    sweep:
+
+    1. moves end_date by trial extensions added since the last sweep
+       (Subscription.extended_days records what is already applied); an expired
+       subscription whose new end_date is in the future becomes ACTIVE again and
+       its user gets current_plan_id back,
+    2. flips active subscriptions past their end_date to EXPIRED, `batch_size`
+       rows per UPDATE and transaction,
+    3. clears current_plan_id of users whose current subscription just expired.
+
+    Users whose current plan changed are published on the user cache channel
+    when the transaction commits, so every worker drops their cached principal.
+    """
+
+    def __init__(self, interval_seconds: int, batch_size: int):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        if self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"❌ Subscription expiry sweep failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def sweep(self) -> dict | None:
+        """Run one sweep if this process wins the lock, returns counts or None when another process holds it."""
+        import asyncpg
+
+        # Closing the connection releases the session level lock
+        connection = await asyncpg.connect(get_asyncpg_dsn())
+        try:
+            if not await connection.fetchval("SELECT pg_try_advisory_lock($1)", SWEEPER_LOCK_KEY):
+                return None
+            extended, restored = await self._apply_extensions()
+            expired, cleared = await self._expire()
+        finally:
+            await connection.close()
+        return {"extended": extended, "plans_restored": restored, "expired": expired, "plans_cleared": cleared}
+
+    async def _apply_extensions(self) -> tuple[int, int]:
+        totals = (
+            select(
+                TrialPeriodExtension.subscription_id,
+                func.sum(TrialPeriodExtension.extended_days).cast(Integer).label("total"),
+            )
+            .group_by(TrialPeriodExtension.subscription_id)
+            .subquery()
+        )
+        new_end_date = Subscription.end_date + func.make_interval(0, 0, 0, totals.c.total - Subscription.extended_days)
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                update(Subscription)
+                .where(
+                    Subscription.id == totals.c.subscription_id,
+                    Subscription.end_date.is_not(None),
+                    Subscription.extended_days != totals.c.total,
+                )
+                .values(
+                    end_date=new_end_date,
+                    extended_days=totals.c.total,
+                    status=case((new_end_date >= datetime.utcnow(), SUBSCRIPTION_ACTIVE), else_=Subscription.status),
+                )
+                .returning(Subscription.id, Subscription.status)
+                .execution_options(synchronize_session=False)
+            )).all()
+            emails = await restore_current_plans(db, [row.id for row in rows if row.status == SUBSCRIPTION_ACTIVE])
+            await commit_user_changes(db, emails)
+            return len(rows), len(emails)
+
+    async def _expire(self) -> tuple[int, int]:
+        expired = cleared = 0
+        while True:
+            now = datetime.utcnow()
+            batch = (
+                select(Subscription.id)
+                .where(Subscription.status == SUBSCRIPTION_ACTIVE, Subscription.end_date < now)
+                .order_by(Subscription.end_date)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            async with AsyncSessionLocal() as db:
+                subscription_ids = list((await db.scalars(
+                    update(Subscription)
+                    .where(Subscription.id.in_(batch))
+                    .values(status=SUBSCRIPTION_EXPIRED)
+                    .returning(Subscription.id)
+                    .execution_options(synchronize_session=False)
+                )).all())
+                emails = await clear_current_plans(db, subscription_ids)
+                await commit_user_changes(db, emails)
+            expired += len(subscription_ids)
+            cleared += len(emails)
+            if len(subscription_ids) < self.batch_size:
+                return expired, cleared
+
+
+expiry_sweeper = ExpirySweeper(
+    interval_seconds=Config.SUBSCRIPTION_SWEEP_INTERVAL_SECONDS,
+    batch_size=Config.SUBSCRIPTION_SWEEP_BATCH_SIZE,
+)
@@ -0,0 +1,79 @@
+import io
+import csv
+import json
+from sqlalchemy import Select, select
+
+from ..config.db import AsyncSessionLocal
+from ..accounts.models import User
+from .models import Subscription, SubscriptionPlan
+
+# Rows fetched per round trip from the server side cursor, each batch is written out as one chunk
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = ("id", "user_id", "email", "plan_id", "plan_name", "start_date", "end_date", "status", "created_at")
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def subscription_export_select() -> Select:
+    """Flat rows for the export, plain columns so no ORM objects are built per subscription."""
+    return (
+        select(
+            Subscription.id,
+            Subscription.user_id,
+            User.email,
+            Subscription.plan_id,
+            SubscriptionPlan.name.label("plan_name"),
+            Subscription.start_date,
+            Subscription.end_date,
+            Subscription.status,
+            Subscription.created_at,
+        )
+        .join(User, User.id == Subscription.user_id)
+        .join(SubscriptionPlan, SubscriptionPlan.id == Subscription.plan_id)
+        .order_by(Subscription.id)
+    )
+
+
+def _export_record(row) -> dict:
+    record = dict(row._mapping)
+    record["status"] = row.status.lower()
+    for key in ("start_date", "end_date", "created_at"):
+        if record[key] is not None:
+            record[key] = record[key].isoformat()
+    return {column: record[column] for column in EXPORT_COLUMNS}
+
+
+def _render_csv(records: list[dict], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    if header:
+        writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue()
+
+
+def _render_ndjson(records: list[dict], header: bool) -> str:
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+async def stream_subscription_export(stmt: Select, fmt: str = "csv"):
+    """Yield the export of `stmt` in `fmt`, one chunk per cursor batch.
+
+    Runs on its own session because dependencies with yield are closed before a
+    StreamingResponse body is sent. yield_per makes asyncpg use a server side
+    cursor, so memory stays flat however many subscriptions match.
+    """
+    render = _render_csv if fmt == "csv" else _render_ndjson
+    header = True
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield render([_export_record(row) for row in rows], header)
+            header = False
+    if header and fmt == "csv":
+        # No rows matched, still send the header so the file is well formed
+        yield render([], True)
@@ -1,6 +1,42 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Literal
+from datetime import datetime
+
+from .models import Subscription
+from .constants import SUBSCRIPTION_ACTIVE, SUBSCRIPTION_EXPIRED
 
 class SubscriptionPlanFilter(BaseModel):
     id: Optional[int] = None
 
+
+class SubscriptionFilter(BaseModel):
+    plan_id: Optional[int] = None
+    user_id: Optional[int] = None
+    status: Optional[Literal["active", "expired"]] = None
+    start_date_from: Optional[datetime] = None
+    start_date_to: Optional[datetime] = None
+    end_date_from: Optional[datetime] = None
+    end_date_to: Optional[datetime] = None
+
+
+def subscription_status_clause(value: str):
+    """Match the status materialized by the expiry sweeper."""
+    return Subscription.status == (SUBSCRIPTION_ACTIVE if value == "active" else SUBSCRIPTION_EXPIRED)
+
+
+SUBSCRIPTION_FILTER_COLUMNS = {
+    "plan_id": Subscription.plan_id,
+    "user_id": Subscription.user_id,
+    "status": subscription_status_clause,
+    "start_date_from": lambda value: Subscription.start_date >= value,
+    "start_date_to": lambda value: Subscription.start_date < value,
+    "end_date_from": lambda value: Subscription.end_date >= value,
+    "end_date_to": lambda value: Subscription.end_date < value,
+}
+
+# Columns the admin listing may sort subscriptions by
+SUBSCRIPTION_SORT_COLUMNS = {
+    "id": Subscription.id,
+    "start_date": Subscription.start_date,
+    "created_at": Subscription.created_at,
+}
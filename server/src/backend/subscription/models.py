@@ -1,12 +1,13 @@
 from datetime import datetime
 from sqlalchemy import DateTime
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, BigInteger, ARRAY
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, BigInteger, ARRAY, Index, UniqueConstraint
 
 
 from ..config.db import Base
 from ..base.models import TimeStampedModel
 from ..accounts.models import User
+from .constants import SUBSCRIPTION_ACTIVE
 
 
 class SubscriptionPlan(TimeStampedModel):
@@ -22,6 +23,7 @@ class SubscriptionPlan(TimeStampedModel):
 
     subscriptions = relationship("Subscription", back_populates="plan")  # Corrected relationship
     users = relationship("User", back_populates="current_plan")
+    products = relationship("SubscriptionPlanProduct", back_populates="subscription_plan")
 
 
 
@@ -31,20 +33,56 @@ class Subscription(TimeStampedModel):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     plan_id = Column(Integer, ForeignKey("subscription_plans.id"), nullable=False)
     start_date = Column(DateTime, default=datetime.utcnow)
-    end_date = Column(DateTime, nullable=True)
+    end_date = Column(DateTime, nullable=True, index=True)
+    status = Column(String, nullable=False, default=SUBSCRIPTION_ACTIVE)
+    # Trial extension days already added to end_date, see ExpirySweeper
+    extended_days = Column(Integer, nullable=False, default=0)
 
-    user = relationship("User", back_populates="subscriptions")  # Corrected relationship
+    user = relationship("User", foreign_keys=[user_id], back_populates="subscriptions")  # Corrected relationship
     plan = relationship("SubscriptionPlan", back_populates="subscriptions")  # Corrected relationship
     trial_period_extensions = relationship("TrialPeriodExtension", back_populates="subscription")  # Corrected relationship
 
+    __table_args__ = (
+        # Serves "latest subscription of a user" without a sort
+        Index("ix_subscriptions_user_id_start_date", user_id, start_date.desc()),
+    )
+
 class TrialPeriodExtension(TimeStampedModel):
     __tablename__ = "trial_extensions"
 
-    subscription_id = Column(Integer, ForeignKey("subscriptions.id"), nullable=False)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id"), nullable=False, index=True)
     extended_days = Column(Integer, nullable=False)
     reason = Column(String, nullable=True)
 
     subscription = relationship("Subscription", back_populates="trial_period_extensions")  # Corrected relationship
 
 
+class SubscriptionPlanProduct(TimeStampedModel):
+    """Shopify product included in a subscription plan."""
+    __tablename__ = "subscription_plan_products"
+
+    subscription_plan_id = Column(Integer, ForeignKey("subscription_plans.id"), nullable=False)
+    product_id = Column(BigInteger, nullable=False)
+
+    subscription_plan = relationship("SubscriptionPlan", back_populates="products")
+    variants = relationship("SubscriptionPlanProductVariant", back_populates="subscription_plan_product")
+
+    __table_args__ = (
+        # Conflict target of the bulk insert in add_products_and_variants_to_plan
+        UniqueConstraint("subscription_plan_id", "product_id", name="uq_subscription_plan_products_plan_id_product_id"),
+    )
+
+
+class SubscriptionPlanProductVariant(TimeStampedModel):
+    """Shopify variant of a product included in a subscription plan."""
+    __tablename__ = "subscription_plan_product_variants"
+
+    subscription_plan_product_id = Column(Integer, ForeignKey("subscription_plan_products.id"), nullable=False)
+    variant_id = Column(BigInteger, nullable=False)
+
+    subscription_plan_product = relationship("SubscriptionPlanProduct", back_populates="variants")
 
+    __table_args__ = (
+        UniqueConstraint("subscription_plan_product_id", "variant_id",
+                         name="uq_subscription_plan_product_variants_product_id_variant_id"),
+    )
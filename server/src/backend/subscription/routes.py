@@ -1,22 +1,30 @@
-import shopify
 import hmac
 import hashlib
 import base64
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
-from fastapi.responses import JSONResponse
-from fastapi import APIRouter, status, Depends, HTTPException, Request, Header
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi import APIRouter, status, Depends, HTTPException, Request, Header, Query
 from fastapi.security import OAuth2PasswordBearer
-from datetime import datetime, timedelta
+from datetime import datetime
 
 
-from ..config.db import get_db
+from ..config.db import get_async_db
 from ..accounts.services import get_current_user
+from ..accounts.cache_sync import commit_user_changes
+from ..base.auth import AuthenticatedUser
 from ..accounts.models import User
 from ..base import response
+from ..base.pagination_filter import PaginationAndSortingOptions, filter_select, paginate_select
 from .models import SubscriptionPlan, Subscription
 from .serializer import SubscriptionPlanSerializer, SubscriptionPlanUpdateSerializer, SubscriptionCreateSerializer
-from .filters import SubscriptionPlanFilter
+from .filters import SubscriptionPlanFilter, SubscriptionFilter, SUBSCRIPTION_FILTER_COLUMNS, SUBSCRIPTION_SORT_COLUMNS
+from .export import EXPORT_MEDIA_TYPES, subscription_export_select, stream_subscription_export
+from .cache import plan_catalog
+from .current import refresh_current_subscription
+from .expiry import compute_end_date, subscription_status
+from ..config.config import Config
 
 subscription_plan_router = APIRouter()
 subscription_router = APIRouter()
@@ -25,8 +33,8 @@ subscription_router = APIRouter()
 @subscription_plan_router.post("/")
 async def create_subscription_plan(
     request_data: SubscriptionPlanSerializer,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check if the user is an admin    
     if not user or not user.is_superuser:
@@ -40,32 +48,35 @@ async def create_subscription_plan(
         trial_period_days=request_data.trial_period_days
     )
     db.add(plan)
-    db.commit()
-    db.refresh(plan)
+    await plan_catalog.publish_invalidation(db)
+    await db.commit()
+    plan_catalog.invalidate()
     return response.Ok("Subscription plan created successfully")
 
 @subscription_plan_router.get("/")
 async def get_subscription_plans(
-    db: Session = Depends(get_db),
+    request: Request,
     filters: SubscriptionPlanFilter = Depends(),
 ):
-    plans = db.query(SubscriptionPlan).filter(SubscriptionPlan.is_active == True).all()
-    if filters.id:
-        plans = [plan for plan in plans if plan.id == filters.id]
-    return plans
+    # Served from the in-process catalog cache, Postgres is only read after a change or TTL expiry
+    body, etag = await plan_catalog.render(filters.id)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={Config.PLAN_CATALOG_MAX_AGE_SECONDS}"}
+    if etag in [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @subscription_plan_router.put("/")
 async def update_subscription_plan(
     request_data: SubscriptionPlanUpdateSerializer,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     
     if not user or not user.is_superuser:
         raise response.BadRequest("You are not authorized to update a subscription plan")
     
     # Check if the plan exists
-    plan = db.query(SubscriptionPlan).filter(SubscriptionPlan.id == request_data.id).first()
+    plan = await db.scalar(select(SubscriptionPlan).where(SubscriptionPlan.id == request_data.id))
     if not plan:
         raise response.BadRequest("Subscription plan does not exist")
     
@@ -76,7 +87,10 @@ async def update_subscription_plan(
     plan.description = request_data.description
     plan.features = request_data.features
     plan.trial_period_days = request_data.trial_period_days
-    db.commit()
+    await plan_catalog.publish_invalidation(db)
+    # Cached principals embed a snapshot of their current plan
+    await commit_user_changes(db, None)
+    plan_catalog.invalidate()
     
     return response.Ok("Subscription plan updated successfully")
 
@@ -84,49 +98,73 @@ async def update_subscription_plan(
 @subscription_router.post("/")
 async def create_subscription(
     request_data: SubscriptionCreateSerializer,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check if the user exists
-    user = db.query(User).filter(User.id == request_data.user_id).first()
+    user = await db.scalar(select(User).where(User.id == request_data.user_id))
     if not user:
         raise response.BadRequest("User does not exist")
     
     #check Plan id
-    plan = db.query(SubscriptionPlan).filter(SubscriptionPlan.id == request_data.plan_id).first()
+    plan = await db.scalar(select(SubscriptionPlan).where(SubscriptionPlan.id == request_data.plan_id))
     if not plan:
         raise response.BadRequest("Subscription plan does not exist")
     
     # Check if the plan exists
-    plan = db.query(SubscriptionPlan).filter(SubscriptionPlan.id == request_data.plan_id).first()
+    plan = await db.scalar(select(SubscriptionPlan).where(SubscriptionPlan.id == request_data.plan_id))
     if not plan:
         raise response.BadRequest("Subscription plan does not exist")
     
-    end_date = request_data.start_date + timedelta(days=10)
+    start_date = request_data.start_date or datetime.utcnow()
+    end_date = compute_end_date(start_date, plan.interval, plan.trial_period_days)
     # Create the subscription
     subscription = Subscription(
         user_id=request_data.user_id,
         plan_id=request_data.plan_id,
-        start_date=request_data.start_date,
-        end_date=end_date
+        start_date=start_date,
+        end_date=end_date,
+        status=subscription_status(end_date),
+        extended_days=0,
     )
     db.add(subscription)
-    db.commit()   
+    await db.flush()
+    await refresh_current_subscription(db, user.id)
+    await commit_user_changes(db, [user.email])
     
     return response.Ok("Subscription created successfully")
 
 @subscription_router.get("/")
 async def get_subscriptions(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthenticatedUser = Depends(get_current_user),
+    filters: SubscriptionFilter = Depends(),
+    options: PaginationAndSortingOptions = Depends(),
 ):
     if user.is_superuser:
-        # If the user is an admin, get all subscriptions
-        subscriptions = db.query(Subscription).options(joinedload(Subscription.plan)).all()
-        return subscriptions
+        # Admins see every subscription, filtered and paginated in SQL
+        stmt = filter_select(select(Subscription).options(joinedload(Subscription.plan)), filters, SUBSCRIPTION_FILTER_COLUMNS)
+        page = await paginate_select(db, stmt, options, SUBSCRIPTION_SORT_COLUMNS, Subscription.id)
+        return response.Ok("Subscriptions found", page)
     
     # Get the subscriptions
-    subscriptions = db.query(Subscription).filter(Subscription.user_id == user.id).options(joinedload(Subscription.plan)).all()
+    subscriptions = (await db.scalars(select(Subscription).where(Subscription.user_id == user.id).options(joinedload(Subscription.plan)))).all()
     
     return subscriptions
 
-    
+
+@subscription_router.get("/export")
+async def export_subscriptions(
+    user: AuthenticatedUser = Depends(get_current_user),
+    filters: SubscriptionFilter = Depends(),
+    format: str = Query("csv", regex="^(csv|ndjson)$"),
+):
+    """Admin report of every matching subscription, streamed from a server side cursor."""
+    if not user.is_superuser:
+        raise response.BadRequest("You are not authorized to export subscriptions")
+    stmt = filter_select(subscription_export_select(), filters, SUBSCRIPTION_FILTER_COLUMNS)
+    filename = "subscriptions-{}.{}".format(datetime.utcnow().strftime("%Y%m%d%H%M%S"), format)
+    return StreamingResponse(
+        stream_subscription_export(stmt, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -31,7 +31,7 @@ class SubscriptionPlanUpdateSerializer(SubscriptionPlanSerializer):
 class SubscriptionCreateSerializer(BaseModel):
     plan_id: int
     user_id: int
-    start_date: Optional[str] = datetime.utcnow()
+    start_date: Optional[datetime] = None
 
     class Config:
         schema_extra = {
@@ -1,74 +1,103 @@
 from fastapi import HTTPException, status
+from sqlalchemy import select, delete, exists
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from .models import SubscriptionPlanProduct, SubscriptionPlanProductVariant
 
 
-def add_products_and_variants_to_plan(plan_id, products_dict, db):
-    """Add products and their variants to a subscription plan."""
+async def add_products_and_variants_to_plan(plan_id: int, products_dict, db: AsyncSession) -> dict:
+    """Add products and their variants to a subscription plan.
+
+    Set based: one INSERT ... ON CONFLICT DO NOTHING RETURNING for all products,
+    one SELECT for the products that already existed, one insert for all
+    variants, however many products are given. The unique constraints make the
+    call idempotent. Large lists are sent as executemany, which SQLAlchemy
+    batches into multi-row INSERTs. The caller commits. Returns how many rows
+    were added.
+    """
     try:
+        variants_by_product = {}
         for product in products_dict:
-            db_product = db.query(SubscriptionPlanProduct).filter(
-                SubscriptionPlanProduct.subscription_plan_id == plan_id,
-                SubscriptionPlanProduct.product_id == product.product_id
-            ).first()
+            variants_by_product.setdefault(product.product_id, set()).update(product.variants or [])
+        if not variants_by_product:
+            return {"products_added": 0, "variants_added": 0}
 
-            if not db_product:
-                db_product = SubscriptionPlanProduct(subscription_plan_id=plan_id, product_id=product.product_id)
-                db.add(db_product)
-                db.flush()
-            
-            if product.variants:
-                db_variants = db.query(SubscriptionPlanProductVariant).filter(
-                    SubscriptionPlanProductVariant.subscription_plan_product_id == db_product.id,
-                    SubscriptionPlanProductVariant.variant_id.in_(product.variants)
-                ).all()
-                existing_variant_ids = {variant.variant_id for variant in db_variants}
-                new_variants = [
-                    SubscriptionPlanProductVariant(subscription_plan_product_id=db_product.id, variant_id=variant)
-                    for variant in product.variants if variant not in existing_variant_ids
-                ]
-                db.add_all(new_variants)
-                db.flush()
+        inserted = (await db.execute(
+            insert(SubscriptionPlanProduct)
+            .on_conflict_do_nothing(constraint="uq_subscription_plan_products_plan_id_product_id")
+            .returning(SubscriptionPlanProduct.id, SubscriptionPlanProduct.product_id),
+            [{"subscription_plan_id": plan_id, "product_id": product_id} for product_id in variants_by_product],
+        )).all()
+        plan_product_ids = {row.product_id: row.id for row in inserted}
+
+        existing = [product_id for product_id in variants_by_product if product_id not in plan_product_ids]
+        if existing:
+            plan_product_ids.update((await db.execute(
+                select(SubscriptionPlanProduct.product_id, SubscriptionPlanProduct.id)
+                .where(
+                    SubscriptionPlanProduct.subscription_plan_id == plan_id,
+                    SubscriptionPlanProduct.product_id.in_(existing),
+                )
+            )).tuples().all())
+
+        variant_rows = [
+            {"subscription_plan_product_id": plan_product_ids[product_id], "variant_id": variant_id}
+            for product_id, variant_ids in variants_by_product.items()
+            for variant_id in variant_ids
+        ]
+        variants_added = 0
+        if variant_rows:
+            variants_added = len((await db.execute(
+                insert(SubscriptionPlanProductVariant)
+                .on_conflict_do_nothing(constraint="uq_subscription_plan_product_variants_product_id_variant_id")
+                .returning(SubscriptionPlanProductVariant.id),
+                variant_rows,
+            )).all())
+        return {"products_added": len(inserted), "variants_added": variants_added}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
-    
 
-def delete_products_and_variants_from_plan(plan_id, delete_products, db):
+
+async def delete_products_and_variants_from_plan(plan_id: int, delete_products, db: AsyncSession):
     """Delete products and their variants from a subscription plan."""
-    try:       
+    plan_products = select(SubscriptionPlanProduct.id).where(SubscriptionPlanProduct.subscription_plan_id == plan_id)
+    try:
         if delete_products.product_ids:
-                # Delete all the variants of the products
-                db.query(SubscriptionPlanProductVariant).filter(
-                    SubscriptionPlanProductVariant.subscription_plan_product_id.in_(
-                        db.query(SubscriptionPlanProduct.id).filter(
-                            SubscriptionPlanProduct.subscription_plan_id == plan_id,
-                            SubscriptionPlanProduct.product_id.in_(delete_products.product_ids)
-                        )
-                    )
-                ).delete(synchronize_session=False)
-                # Delete the products
-                db.query(SubscriptionPlanProduct).filter(
+            # Delete all the variants of the products
+            await db.execute(
+                delete(SubscriptionPlanProductVariant)
+                .where(SubscriptionPlanProductVariant.subscription_plan_product_id.in_(
+                    plan_products.where(SubscriptionPlanProduct.product_id.in_(delete_products.product_ids))
+                ))
+            )
+            # Delete the products
+            await db.execute(
+                delete(SubscriptionPlanProduct)
+                .where(
                     SubscriptionPlanProduct.subscription_plan_id == plan_id,
-                    SubscriptionPlanProduct.product_id.in_(delete_products.product_ids)
-                ).delete()
-            
-        if delete_products.variants_ids:  
-            db.query(SubscriptionPlanProductVariant).filter(
-                SubscriptionPlanProductVariant.subscription_plan_product_id.in_(
-                    db.query(SubscriptionPlanProduct.id).filter(
-                        SubscriptionPlanProduct.subscription_plan_id == plan_id
-                    )
-                ),
-                SubscriptionPlanProductVariant.variant_id.in_(delete_products.variants_ids)
-            ).delete()
+                    SubscriptionPlanProduct.product_id.in_(delete_products.product_ids),
+                )
+            )
+
+        if delete_products.variants_ids:
+            await db.execute(
+                delete(SubscriptionPlanProductVariant)
+                .where(
+                    SubscriptionPlanProductVariant.subscription_plan_product_id.in_(plan_products),
+                    SubscriptionPlanProductVariant.variant_id.in_(delete_products.variants_ids),
+                )
+            )
 
             # Check if the product has no variants left, then delete the product
-            db.query(SubscriptionPlanProduct).filter(
-                SubscriptionPlanProduct.subscription_plan_id == plan_id,
-                SubscriptionPlanProduct.id.notin_(
-                    db.query(SubscriptionPlanProductVariant.subscription_plan_product_id).distinct()
+            await db.execute(
+                delete(SubscriptionPlanProduct)
+                .where(
+                    SubscriptionPlanProduct.subscription_plan_id == plan_id,
+                    ~exists().where(SubscriptionPlanProductVariant.subscription_plan_product_id == SubscriptionPlanProduct.id),
                 )
-            ).delete()
+            )
     except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
\ No newline at end of file
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -1,15 +1,24 @@
 import uvicorn
 import logging
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.security import OAuth2PasswordBearer
 
 from backend.routes import app_router
-from backend.config.db import Base, engine
+from backend.config.db import Base, engine, async_engine, get_pool_stats
+from backend.config.pool import pool_metric_lines
+from backend.config.metrics import MetricsMiddleware, instrument_engine, registry, require_metrics_token
 from backend.config.config import Config
 from backend.config.logger import LoggingMiddleware
 from backend.base.exceptions import global_exception_handler
+from backend.resume.jobs import optimization_jobs
+from backend.base.mailer import email_queue
+from backend.base.email_templates import email_templates
+from backend.subscription.expiry import expiry_sweeper
+from backend.base.cache_sync import cache_listener
 
 
 logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
@@ -25,10 +34,26 @@ This REST API is able to;
 - List all the Collections
 """
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background workers
+    await cache_listener.start()
+    await optimization_jobs.start()
+    email_templates.precompile()
+    await email_queue.start()
+    await expiry_sweeper.start()
+    yield
+    await expiry_sweeper.stop()
+    await email_queue.stop()
+    await optimization_jobs.stop()
+    await cache_listener.stop()
+
+
 app = FastAPI(
     title="Shopify App Backend",
     description=description,
     version=version,
+    lifespan=lifespan,
 )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"/api/{version}/user/token")
@@ -50,8 +75,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create the database tables
-Base.metadata.create_all(bind=engine)
+# Metrics: outermost middleware so it times the whole stack
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+registry.add_collector(lambda: pool_metric_lines(get_pool_stats()))
+
+# The schema is managed by Alembic (`alembic upgrade head`); create_all is opt in for local development
+if Config.DB_AUTO_CREATE_TABLES:
+    Base.metadata.create_all(bind=engine)
 
 # include the routers
 app.include_router(app_router, prefix=f"/api/{version}")
@@ -61,5 +93,15 @@ app.include_router(app_router, prefix=f"/api/{version}")
 async def root():
     return {"message": "Welcome to Shopify App Backend!", "docs": "/docs"}
 
+
+@app.get("/pool-stats", tags=["Root"], include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def pool_stats():
+    return get_pool_stats()
+
+
+@app.get("/metrics", tags=["Root"], include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8081)
@@ -0,0 +1,172 @@
+"""Baseline schema, as created by the former startup create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def timestamp_columns() -> list:
+    """Columns every TimeStampedModel table carries."""
+    return [
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "subscription_plans",
+        *timestamp_columns(),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("interval", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("features", postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column("trial_period_days", sa.Integer(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("password", sa.String(), nullable=False),
+        sa.Column("is_verified", sa.Boolean(), nullable=True),
+        sa.Column("is_google_user", sa.Boolean(), nullable=True),
+        sa.Column("referral_code", sa.String(), nullable=True),
+        sa.Column("current_plan_id", sa.Integer(), nullable=True),
+        sa.Column("is_superuser", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(["current_plan_id"], ["subscription_plans.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_id", "users", ["id"], unique=False)
+    op.create_table(
+        "referrals",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("referred_id", sa.Integer(), nullable=False),
+        sa.Column("referred_by_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["referred_by_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["referred_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_referrals_id", "referrals", ["id"], unique=False)
+    op.create_table(
+        "verification_codes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("code", sa.String(), nullable=False),
+        sa.Column("is_used", sa.Boolean(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("used_for", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("code"),
+    )
+    op.create_index("ix_verification_codes_id", "verification_codes", ["id"], unique=False)
+    op.create_table(
+        "subscriptions",
+        *timestamp_columns(),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("plan_id", sa.Integer(), nullable=False),
+        sa.Column("start_date", sa.DateTime(), nullable=True),
+        sa.Column("end_date", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["plan_id"], ["subscription_plans.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "trial_extensions",
+        *timestamp_columns(),
+        sa.Column("subscription_id", sa.Integer(), nullable=False),
+        sa.Column("extended_days", sa.Integer(), nullable=False),
+        sa.Column("reason", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["subscription_id"], ["subscriptions.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "resumes",
+        *timestamp_columns(),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("phone", sa.String(), nullable=True),
+        sa.Column("location", sa.String(), nullable=True),
+        sa.Column("linkedin", sa.String(), nullable=True),
+        sa.Column("professional_title", sa.String(), nullable=True),
+        sa.Column("summary", sa.String(), nullable=True),
+        sa.Column("skills", postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column("career_highlights", postgresql.ARRAY(sa.String()), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "experiences",
+        *timestamp_columns(),
+        sa.Column("resume_id", sa.Integer(), nullable=False),
+        sa.Column("job_title", sa.String(), nullable=False),
+        sa.Column("organization", sa.String(), nullable=False),
+        sa.Column("start_date", sa.String(), nullable=False),
+        sa.Column("end_date", sa.String(), nullable=True),
+        sa.Column("is_current", sa.Boolean(), nullable=True),
+        sa.Column("description", postgresql.ARRAY(sa.String()), nullable=True),
+        sa.ForeignKeyConstraint(["resume_id"], ["resumes.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "educations",
+        *timestamp_columns(),
+        sa.Column("resume_id", sa.Integer(), nullable=False),
+        sa.Column("degree", sa.String(), nullable=False),
+        sa.Column("institution", sa.String(), nullable=False),
+        sa.Column("start_date", sa.String(), nullable=False),
+        sa.Column("end_date", sa.String(), nullable=True),
+        sa.Column("is_current", sa.Boolean(), nullable=True),
+        sa.Column("grade", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["resume_id"], ["resumes.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "certifications",
+        *timestamp_columns(),
+        sa.Column("resume_id", sa.Integer(), nullable=False),
+        sa.Column("certification_name", sa.String(), nullable=False),
+        sa.Column("issuing_organization", sa.String(), nullable=False),
+        sa.Column("issue_date", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["resume_id"], ["resumes.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("certifications")
+    op.drop_table("educations")
+    op.drop_table("experiences")
+    op.drop_table("resumes")
+    op.drop_table("trial_extensions")
+    op.drop_table("subscriptions")
+    op.drop_index("ix_verification_codes_id", table_name="verification_codes")
+    op.drop_table("verification_codes")
+    op.drop_index("ix_referrals_id", table_name="referrals")
+    op.drop_table("referrals")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
+    op.drop_table("subscription_plans")
@@ -0,0 +1,41 @@
+"""Indexes on hot filter columns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns) built CONCURRENTLY so existing tables stay writable
+INDEXES = [
+    ("ix_resumes_user_id", "resumes", ["user_id"]),
+    ("ix_experiences_resume_id", "experiences", ["resume_id"]),
+    ("ix_educations_resume_id", "educations", ["resume_id"]),
+    ("ix_certifications_resume_id", "certifications", ["resume_id"]),
+    ("ix_users_referral_code", "users", ["referral_code"]),
+    ("ix_verification_codes_user_id_used_for", "verification_codes", ["user_id", "used_for"]),
+    ("ix_subscriptions_user_id_start_date", "subscriptions", ["user_id", sa.text("start_date DESC")]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,42 @@
+"""Current subscription pointer on users
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("current_subscription_id", sa.Integer(), nullable=True))
+    op.create_foreign_key("fk_users_current_subscription_id", "users", "subscriptions", ["current_subscription_id"], ["id"])
+
+    # Point every user at their latest subscription, current_plan_id only while it has not ended
+    op.execute("""
+        UPDATE users
+        SET current_subscription_id = latest.id,
+            current_plan_id = CASE WHEN latest.end_date IS NULL OR latest.end_date >= now() AT TIME ZONE 'utc'
+                                   THEN latest.plan_id END
+        FROM (
+            SELECT DISTINCT ON (user_id) id, user_id, plan_id, end_date
+            FROM subscriptions
+            ORDER BY user_id, start_date DESC, id DESC
+        ) AS latest
+        WHERE latest.user_id = users.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_constraint("fk_users_current_subscription_id", "users", type_="foreignkey")
+    op.drop_column("users", "current_subscription_id")
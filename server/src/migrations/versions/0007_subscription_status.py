@@ -0,0 +1,36 @@
+"""Materialized subscription status for the expiry sweeper
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The server defaults fill existing rows without a table rewrite, the app always sets both columns
+    op.add_column("subscriptions", sa.Column("status", sa.String(), nullable=False, server_default="ACTIVE"))
+    op.add_column("subscriptions", sa.Column("extended_days", sa.Integer(), nullable=False, server_default="0"))
+    op.execute("UPDATE subscriptions SET status = 'EXPIRED' WHERE end_date < now() AT TIME ZONE 'utc'")
+    # The sweeper's end_date range is served by ix_subscriptions_end_date (0006)
+    with op.get_context().autocommit_block():
+        op.create_index("ix_trial_extensions_subscription_id", "trial_extensions", ["subscription_id"],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_trial_extensions_subscription_id", table_name="trial_extensions", postgresql_concurrently=True, if_exists=True)
+    op.drop_column("subscriptions", "extended_days")
+    op.drop_column("subscriptions", "status")
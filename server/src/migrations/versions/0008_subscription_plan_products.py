@@ -0,0 +1,51 @@
+"""Products and variants included in subscription plans
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "subscription_plan_products",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=True),
+        sa.Column("subscription_plan_id", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["subscription_plan_id"], ["subscription_plans.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("subscription_plan_id", "product_id", name="uq_subscription_plan_products_plan_id_product_id"),
+    )
+    op.create_table(
+        "subscription_plan_product_variants",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=True),
+        sa.Column("subscription_plan_product_id", sa.Integer(), nullable=False),
+        sa.Column("variant_id", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["subscription_plan_product_id"], ["subscription_plan_products.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("subscription_plan_product_id", "variant_id",
+                            name="uq_subscription_plan_product_variants_product_id_variant_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("subscription_plan_product_variants")
+    op.drop_table("subscription_plan_products")
@@ -0,0 +1,30 @@
+"""Index for the resume summary keyset
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index("ix_resumes_user_id_last_modified", "resumes",
+                        ["user_id", sa.text("coalesce(updated_at, created_at) DESC"), sa.text("id DESC")],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_resumes_user_id_last_modified", table_name="resumes", postgresql_concurrently=True, if_exists=True)